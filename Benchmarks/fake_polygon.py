@@ -0,0 +1,208 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import unquote, urlsplit
+
+from SPYData.market_cap_list import MARKET_CAP
+from StockMarketData.snapshot_store import (SANDBOX_SNAPSHOTS,
+                                            load_sandbox_snapshot)
+
+# Dates without a bundled snapshot are served the bars of this one
+DEFAULT_SANDBOX_SNAPSHOT = "SANDBOX_STOCK_MARKET"
+
+GROUPED_DAILY_PATH = re.compile(
+    r"^/v2/aggs/grouped/locale/us/market/stocks/(\d{4}-\d{2}-\d{2})$"
+)
+PREVIOUS_CLOSE_PATH = re.compile(r"^/v2/aggs/ticker/([^/]+)/prev$")
+TICKER_DETAILS_PATH = re.compile(r"^/v3/reference/tickers/([^/]+)$")
+SPLITS_PATH = "/v3/reference/splits"
+SPY_CONSTITUENTS_PATH = "/api/List_of_S&P_500_companies"
+
+
+class _FakePolygonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle's algorithm
+    # and delayed ACKs stall by ~40 ms per keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status_code: int, body: bytes) -> None:
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        path = unquote(urlsplit(self.path).path)
+        status_code, body = self.server.fake_polygon.response(path)
+        self._send(status_code, body)
+
+
+class FakePolygonServer:
+    """
+    Local HTTP server answering the Polygon and wikitable2json requests the
+    screeners make, from the bundled sandbox snapshots and market caps
+
+    Grouped-daily bodies are encoded once per snapshot and then served from
+    memory, so request handling costs next to nothing next to the client.
+    Stock splits are served from splits, Polygon split records, all on one
+    page
+    """
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, splits: tuple = ()
+    ):
+        self.splits = list(splits)
+        self._server = ThreadingHTTPServer((host, port), _FakePolygonHandler)
+        self._server.daemon_threads = True
+        self._server.fake_polygon = self
+        self._thread = None
+        self._bodies = {}
+        self._bodies_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakePolygonServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakePolygonServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _grouped_daily_body(self, name: str) -> bytes:
+        with self._bodies_lock:
+            if name not in self._bodies:
+                snapshot = load_sandbox_snapshot(name)
+                response = dict(snapshot.metadata)
+                response["results"] = list(snapshot["results"])
+                self._bodies[name] = json.dumps(response).encode()
+            return self._bodies[name]
+
+    def response(self, path: str) -> Tuple[int, bytes]:
+        """
+        Provides the status code and body answering a request path
+
+        Args:
+            path (str): The unquoted URL path
+
+        Returns:
+            Tuple[int, bytes]: The status code and JSON body
+        """
+        match = GROUPED_DAILY_PATH.match(path)
+        if match:
+            return 200, self._grouped_daily_body(
+                snapshot_name_for_date(match.group(1))
+            )
+
+        match = PREVIOUS_CLOSE_PATH.match(path)
+        if match:
+            snapshot = load_sandbox_snapshot(DEFAULT_SANDBOX_SNAPSHOT)
+            bar = snapshot.by_ticker.get(match.group(1))
+            if bar is None:
+                return 404, json.dumps({"status": "NOT_FOUND"}).encode()
+            return 200, json.dumps(
+                {"status": "OK", "resultsCount": 1, "results": [dict(bar)]}
+            ).encode()
+
+        match = TICKER_DETAILS_PATH.match(path)
+        if match:
+            market_cap = MARKET_CAP.get(match.group(1))
+            if market_cap is None:
+                return 404, json.dumps({"status": "NOT_FOUND"}).encode()
+            return 200, json.dumps(
+                {
+                    "status": "OK",
+                    "results": {
+                        "ticker": match.group(1),
+                        "market_cap": market_cap,
+                    },
+                }
+            ).encode()
+
+        if path == SPLITS_PATH:
+            return 200, json.dumps(
+                {"status": "OK", "results": self.splits}
+            ).encode()
+
+        if path == SPY_CONSTITUENTS_PATH:
+            table = [["Symbol", "Security"]] + [
+                [ticker_symbol, ticker_symbol] for ticker_symbol in MARKET_CAP
+            ]
+            # Wikipedia's second table lists the dated changes, none here
+            changes_table = [["Date", "Added", "", "Removed", "", "Reason"]]
+            return 200, json.dumps([table, changes_table]).encode()
+
+        return 404, json.dumps({"status": "NOT_FOUND"}).encode()
+
+
+def snapshot_name_for_date(date: str) -> str:
+    """
+    Provides the sandbox snapshot served for a grouped-daily date
+
+    Args:
+        date (str): The date, YYYY-MM-DD
+
+    Returns:
+        str: A key of SANDBOX_SNAPSHOTS
+    """
+    for name, snapshot_date in SANDBOX_SNAPSHOTS.items():
+        if snapshot_date == date:
+            return name
+    return DEFAULT_SANDBOX_SNAPSHOT
+
+
+def point_settings_at(base_url: str, cache_directory: str) -> None:
+    """
+    Points the HTTP endpoints and every on-disk cache of Utils.settings at
+    a fake server and a scratch directory
+
+    Must run before the modules reading those settings are imported
+
+    Args:
+        base_url (str): The fake server's URL
+        cache_directory (str): The scratch cache directory
+
+    Returns:
+        None
+    """
+    from Utils import settings
+
+    settings.POLYGON_BASE_URL = base_url
+    settings.WIKITABLE2JSON_BASE_URL = base_url
+    settings.POLYGON_REQUESTS_PER_MINUTE = 0
+    settings.POLYGON_CACHE_DIRECTORY = cache_directory
+    settings.BAR_WAREHOUSE_DIRECTORY = os.path.join(
+        cache_directory, "bar_warehouse"
+    )
+    settings.SPY_CONSTITUENTS_CACHE_PATH = os.path.join(
+        cache_directory, "spy_constituents.json"
+    )
+    settings.SPY_MEMBERSHIP_PATH = os.path.join(
+        cache_directory, "spy_membership.csv"
+    )
+    settings.MOMENTUM_STATE_DIRECTORY = os.path.join(
+        cache_directory, "momentum_state"
+    )
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import json
+from typing import Tuple
+
+# Modules a live run imports, none of which may load a sandbox dataset
+LIVE_MODULES = (
+    "StockMarketData.market_information",
+    "StockMarketData.async_market_information",
+    "StockMarketData.bar_warehouse",
+    "SPYData.stocks_data",
+    "SPYData.async_stocks_data",
+    "QuantitativeMomentumScreener.high_quality_momentum_screener",
+    "QuantitativeMomentumScreener.parameter_sweep",
+    "QuantitativeMomentumScreener.momentum_backtester",
+)
+
+REPOSITORY_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+seconds = time.perf_counter() - start
+from StockMarketData.snapshot_store import load_sandbox_snapshot
+print(json.dumps({{
+    "seconds": seconds,
+    "sandbox_datasets_loaded": load_sandbox_snapshot.cache_info().currsize,
+}}))
+"""
+
+_SANDBOX_PROBE = """
+import json, time
+from StockMarketData.snapshot_store import (SANDBOX_SNAPSHOTS,
+                                            load_sandbox_snapshot)
+start = time.perf_counter()
+for name in SANDBOX_SNAPSHOTS:
+    load_sandbox_snapshot(name).ticker_index
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def _run_probe(source: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", source],
+        cwd=REPOSITORY_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def live_import_check(
+    modules: Tuple[str, ...] = LIVE_MODULES
+) -> Tuple[dict, bool]:
+    """
+    Imports the live modules in a fresh interpreter and checks that no
+    sandbox dataset was loaded on the way
+
+    Args:
+        modules (Tuple[str, ...]): The modules to import
+
+    Returns:
+        Tuple[dict, bool]:
+        The import time, the number of sandbox datasets loaded and the time
+        a sandbox run spends loading them, and a Status which is False if
+        importing loaded any sandbox dataset
+    """
+    result = _run_probe(_PROBE.format(modules=tuple(modules)))
+    result["sandbox_load_seconds"] = _run_probe(_SANDBOX_PROBE)["seconds"]
+    return result, result["sandbox_datasets_loaded"] == 0
+
+
+if __name__ == "__main__":
+    result, status = live_import_check()
+    print(f"Live imports: {result['seconds'] * 1000:.1f} ms")
+    print(f"Sandbox datasets loaded: {result['sandbox_datasets_loaded']}")
+    print(
+        "Sandbox datasets load on first use: "
+        f"{result['sandbox_load_seconds'] * 1000:.1f} ms"
+    )
+    sys.exit(0 if status else 1)
@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+from typing import Callable
+
+# Must be imported after Benchmarks.fake_polygon.point_settings_at has run,
+# the pipelines reading their endpoints and cache paths at import time
+from EqualWeightSPYScreener.equal_weight_spy_screener import \
+    equal_weight_spy_portfolio
+from QuantitativeMomentumScreener.quantitative_momentum_screener import (
+    price_return_for_stocks, quantitative_momentum_portfolio)
+from SPYData.stocks_data import spy_stock_data
+from StockMarketData.market_information import convert_stock_list_to_dictionary
+from StockMarketData.snapshot_store import (SANDBOX_SNAPSHOTS,
+                                            load_sandbox_snapshot)
+
+PORTFOLIO_AMOUNT = 10000000
+PORTFOLIO_SIZE = 50
+
+
+def _equal_weight_spy_portfolio(sandbox: bool) -> Callable[[], None]:
+    return lambda: equal_weight_spy_portfolio(
+        portfolio_amount=PORTFOLIO_AMOUNT, sandbox=sandbox
+    )
+
+
+def _quantitative_momentum_portfolio(sandbox: bool) -> Callable[[], None]:
+    return lambda: quantitative_momentum_portfolio(
+        portfolio_amount=PORTFOLIO_AMOUNT,
+        portfolio_size=PORTFOLIO_SIZE,
+        sandbox=sandbox,
+    )
+
+
+def _price_return_for_stocks(sandbox: bool) -> Callable[[], None]:
+    return lambda: price_return_for_stocks(
+        change_window="1year",
+        portfolio_size=PORTFOLIO_SIZE,
+        current_date=SANDBOX_SNAPSHOTS["STOCK_MARKET_DAY_0_PRICES"],
+        past_date=SANDBOX_SNAPSHOTS["STOCK_MARKET_YEAR_AGO_PRICES"],
+        sandbox=sandbox,
+    )
+
+
+def _convert_stock_list_to_dictionary(sandbox: bool) -> Callable[[], None]:
+    stock_market_list = list(
+        load_sandbox_snapshot("SANDBOX_STOCK_MARKET")["results"]
+    )
+    return lambda: convert_stock_list_to_dictionary(stock_market_list)
+
+
+def _spy_stock_data(sandbox: bool) -> Callable[[], None]:
+    return lambda: spy_stock_data(sandbox=sandbox)
+
+
+# Benchmark name to (setup, modes). setup(sandbox) does the untimed work
+# and returns the callable to time, "live" runs against the fake server
+BENCHMARKS = {
+    "equal_weight_spy_portfolio": (
+        _equal_weight_spy_portfolio,
+        ("sandbox", "live"),
+    ),
+    "quantitative_momentum_portfolio": (
+        _quantitative_momentum_portfolio,
+        ("sandbox", "live"),
+    ),
+    "price_return_for_stocks": (_price_return_for_stocks, ("sandbox", "live")),
+    "convert_stock_list_to_dictionary": (
+        _convert_stock_list_to_dictionary,
+        ("sandbox",),
+    ),
+    "spy_stock_data": (_spy_stock_data, ("sandbox", "live")),
+}
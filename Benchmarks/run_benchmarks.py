@@ -0,0 +1,315 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import gc
+import json
+import resource
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Optional, Tuple
+
+from Utils.settings import BENCHMARK_HISTORY_PATH
+
+DEFAULT_REPEATS = 5
+# Relative growth of a metric over the baseline commit reported as a regression
+REGRESSION_TOLERANCES = {
+    "Wall Seconds": 0.2,
+    "Peak RSS MB": 0.1,
+    "Peak Traced MB": 0.1,
+    "Allocated Blocks": 0.1,
+}
+
+REPOSITORY_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+
+_CHILD = """
+import sys
+sys.path.insert(0, {repository!r})
+from Benchmarks.run_benchmarks import measure_benchmark
+measure_benchmark({benchmark_id!r}, {repeats!r}, {result_path!r})
+"""
+
+
+def benchmark_ids() -> list:
+    """
+    Provides every benchmark id, 'name[mode]'
+
+    Args:
+        None
+
+    Returns:
+        list: The benchmark ids
+    """
+    from Benchmarks.pipelines import BENCHMARKS
+
+    return [
+        f"{name}[{mode}]"
+        for name, (_, modes) in BENCHMARKS.items()
+        for mode in modes
+    ]
+
+
+def measure_benchmark(
+    benchmark_id: str, repeats: int, result_path: str
+) -> None:
+    """
+    Measures one benchmark in the calling process, which should be a fresh
+    interpreter so its peak RSS belongs to this benchmark alone
+
+    A fake Polygon server is started and every cache is pointed at a
+    scratch directory that is emptied before each run, so live runs always
+    go through HTTP. After one warm up run the pipeline is timed repeats
+    times, then run once more under tracemalloc, which also counts the
+    blocks the run allocated and still holds when it returns. Live runs
+    also record the HTTP client's request count, megabytes received and
+    worst endpoint p95 latency
+
+    Args:
+        benchmark_id (str): The benchmark, 'name[mode]'
+        repeats (int): The number of timed runs
+        result_path (str): Where the metrics are written as JSON
+
+    Returns:
+        None
+    """
+    from Benchmarks.fake_polygon import FakePolygonServer, point_settings_at
+
+    name, mode = benchmark_id[:-1].split("[")
+    workspace = tempfile.mkdtemp(prefix="benchmark-")
+    cache_directory = os.path.join(workspace, "cache")
+    server = FakePolygonServer().start()
+    point_settings_at(base_url=server.url, cache_directory=cache_directory)
+
+    from Benchmarks.pipelines import BENCHMARKS
+    from StockMarketData.grouped_daily_cache import grouped_daily_cache
+    from Utils.http_client import http_client
+
+    def reset() -> None:
+        shutil.rmtree(cache_directory, ignore_errors=True)
+        os.makedirs(cache_directory)
+        grouped_daily_cache().clear_memory()
+        gc.collect()
+
+    setup, _ = BENCHMARKS[name]
+    current_directory = os.getcwd()
+    os.chdir(workspace)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            run = setup(mode == "sandbox")
+            reset()
+            run()
+
+            http_client().metrics.reset()
+            wall_seconds = []
+            for _ in range(repeats):
+                reset()
+                start = time.perf_counter()
+                run()
+                wall_seconds.append(time.perf_counter() - start)
+            request_summary = http_client().metrics.summary()
+
+            reset()
+            blocks_before = sys.getallocatedblocks()
+            tracemalloc.start()
+            run()
+            _, peak_traced_bytes = tracemalloc.get_traced_memory()
+            allocated_blocks = sum(
+                statistic.count
+                for statistic in tracemalloc.take_snapshot().statistics(
+                    "filename"
+                )
+            )
+            tracemalloc.stop()
+            gc.collect()
+            net_blocks_retained = sys.getallocatedblocks() - blocks_before
+    finally:
+        os.chdir(current_directory)
+        server.stop()
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    metrics = {
+        "Wall Seconds": statistics.median(wall_seconds),
+        "Best Wall Seconds": min(wall_seconds),
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "Peak RSS MB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "Peak Traced MB": peak_traced_bytes / (1024 * 1024),
+        # Blocks allocated by the run and still traced when it returns
+        "Allocated Blocks": allocated_blocks,
+        # Blocks still allocated after the run, not the blocks it allocated
+        "Net Blocks Retained": net_blocks_retained,
+    }
+    if request_summary:
+        # Per timed run, over every endpoint
+        metrics["HTTP Requests"] = (
+            sum(endpoint["requests"] for endpoint in request_summary.values())
+            / repeats
+        )
+        metrics["HTTP MB"] = sum(
+            endpoint["bytes"] for endpoint in request_summary.values()
+        ) / (repeats * 1024 * 1024)
+        metrics["HTTP p95 Seconds"] = max(
+            endpoint["p95_seconds"] for endpoint in request_summary.values()
+        )
+    with open(result_path, "w") as result_file:
+        json.dump(metrics, result_file)
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=REPOSITORY_DIRECTORY,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_history(path: str = BENCHMARK_HISTORY_PATH) -> list:
+    """
+    Provides the recorded benchmark runs, oldest first
+
+    Args:
+        path (str): The history file
+
+    Returns:
+        list: [{"commit", "dirty", "recorded_at", "results"}]
+    """
+    try:
+        with open(path) as history_file:
+            return json.load(history_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def save_history(history: list, path: str = BENCHMARK_HISTORY_PATH) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(file_descriptor, "w") as history_file:
+        json.dump(history, history_file, indent=4)
+    os.replace(temporary_path, path)
+
+
+def find_regressions(
+    results: dict,
+    baseline_results: dict,
+    tolerances: dict = REGRESSION_TOLERANCES,
+) -> list:
+    """
+    Compares benchmark results against a baseline run
+
+    Args:
+        results (dict): Benchmark id to metrics
+        baseline_results (dict): Benchmark id to the baseline's metrics
+        tolerances (dict): Metric to the relative growth tolerated
+
+    Returns:
+        list: (benchmark id, metric, baseline value, value) of every regression
+    """
+    regressions = []
+    for benchmark_id, metrics in results.items():
+        baseline_metrics = baseline_results.get(benchmark_id, {})
+        for metric, tolerance in tolerances.items():
+            baseline_value = baseline_metrics.get(metric)
+            if baseline_value and metrics[metric] > baseline_value * (
+                1 + tolerance
+            ):
+                regressions.append(
+                    (benchmark_id, metric, baseline_value, metrics[metric])
+                )
+    return regressions
+
+
+def run_benchmarks(
+    selected_benchmark_ids: Optional[list] = None,
+    repeats: int = DEFAULT_REPEATS,
+    history_path: str = BENCHMARK_HISTORY_PATH,
+    save: bool = True,
+) -> Tuple[dict, list]:
+    """
+    Runs the benchmarks, each in a fresh interpreter, and compares them with
+    the last recorded run of a different commit
+
+    The run is recorded in the history under the current commit, replacing
+    an earlier run of the same commit
+
+    Args:
+        selected_benchmark_ids (Optional[list]): The benchmarks to run, defaults to all
+        repeats (int): The number of timed runs of every benchmark
+        history_path (str): The benchmark history file
+        save (bool): If the run should be recorded in the history
+
+    Returns:
+        Tuple[dict, list]: Benchmark id to metrics and the regressions found
+    """
+    results = {}
+    for benchmark_id in selected_benchmark_ids or benchmark_ids():
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    _CHILD.format(
+                        repository=REPOSITORY_DIRECTORY,
+                        benchmark_id=benchmark_id,
+                        repeats=repeats,
+                        result_path=result_file.name,
+                    ),
+                ],
+                cwd=REPOSITORY_DIRECTORY,
+                check=True,
+            )
+            results[benchmark_id] = json.load(result_file)
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    history = load_history(history_path)
+    baseline = next(
+        (run for run in reversed(history) if run["commit"] != commit), None
+    )
+    regressions = (
+        find_regressions(results, baseline["results"]) if baseline else []
+    )
+
+    if save:
+        history = [run for run in history if run["commit"] != commit]
+        history.append(
+            {
+                "commit": commit,
+                "dirty": bool(
+                    _git("status", "--porcelain", "--untracked-files=no")
+                ),
+                "recorded_at": time.time(),
+                "results": results,
+            }
+        )
+        save_history(history, history_path)
+    return results, regressions
+
+
+if __name__ == "__main__":
+    results, regressions = run_benchmarks()
+    for benchmark_id, metrics in results.items():
+        print(
+            f"{benchmark_id}: "
+            + ", ".join(
+                f"{metric} {value:.3f}" for metric, value in metrics.items()
+            )
+        )
+    for benchmark_id, metric, baseline_value, value in regressions:
+        print(
+            f"Regression in {benchmark_id}: "
+            f"{metric} {baseline_value:.3f} -> {value:.3f}"
+        )
+    sys.exit(1 if regressions else 0)
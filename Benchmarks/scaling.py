@@ -0,0 +1,172 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import resource
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+from Benchmarks.fake_polygon import FakePolygonServer, point_settings_at
+from Benchmarks.synthetic_market import SyntheticMarket
+
+PRICE_RETURN_TICKER_COUNTS = (10000, 100000, 1000000)
+# (tickers, trading days), the dense close matrix needing 8 bytes per cell
+BACKTEST_SIZES = ((10000, 1260), (10000, 5000), (100000, 1260))
+SCALING_SEED = 0
+# The price return runs end on this date, their market starting a change
+# window before it
+SCALING_CURRENT_DATE = "2015-12-31"
+# The backtests start this many days in, so a 1year window is available
+DAYS_PER_CHANGE_WINDOW_YEAR = 366
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (
+        1024 * 1024 if sys.platform == "darwin" else 1024
+    )
+
+
+def scaling_benchmark(
+    price_return_ticker_counts: tuple = PRICE_RETURN_TICKER_COUNTS,
+    backtest_sizes: tuple = BACKTEST_SIZES,
+    change_window: str = "1year",
+    portfolio_size: int = 50,
+) -> pd.DataFrame:
+    """
+    Times price_return_for_stocks and the backtest paths over synthetic
+    markets far larger than the sandbox data
+
+    price_return_for_stocks reads its two dates from the grouped-daily
+    cache, momentum_backtest runs on the market's close matrix and
+    quantitative_momentum_backtest reads the market back from a bar
+    warehouse. Generating and storing the market is not timed. Every cache
+    lives in a scratch directory and any request goes to a local fake
+    Polygon server
+
+    Args:
+        price_return_ticker_counts (tuple): The ticker counts of the price return runs
+        backtest_sizes (tuple): The (tickers, trading days) of the backtest runs
+        change_window (str): The momentum change window
+        portfolio_size (int): The number of stocks picked
+
+    Returns:
+        pd.DataFrame: ['Benchmark', 'Tickers', 'Days', 'Wall Seconds', 'Peak RSS MB'],
+        peak RSS being the process peak so far
+    """
+    workspace = tempfile.mkdtemp(prefix="scaling-")
+    cache_directory = os.path.join(workspace, "cache")
+    server = FakePolygonServer().start()
+    point_settings_at(base_url=server.url, cache_directory=cache_directory)
+
+    from constants import POLYGON_API_ADJUSTED
+    from QuantitativeMomentumScreener.momentum_backtester import (
+        momentum_backtest, quantitative_momentum_backtest)
+    from QuantitativeMomentumScreener.quantitative_momentum_screener import \
+        price_return_for_stocks
+    from StockMarketData.bar_warehouse import BarWarehouse
+    from StockMarketData.grouped_daily_cache import grouped_daily_cache
+    from Utils.date_utils import get_dates_in_format_for_change_window
+    from Utils.trading_calendar import nyse_calendar
+
+    rows = []
+
+    def record(benchmark: str, market: SyntheticMarket, start: float):
+        rows.append(
+            {
+                "Benchmark": benchmark,
+                "Tickers": len(market.tickers),
+                "Days": len(market.dates),
+                "Wall Seconds": time.perf_counter() - start,
+                "Peak RSS MB": _peak_rss_mb(),
+            }
+        )
+
+    current_date, past_date = get_dates_in_format_for_change_window(
+        change_window=change_window,
+        current_date_in_format=SCALING_CURRENT_DATE,
+    )
+    price_return_day_count = len(
+        nyse_calendar().sessions_between(past_date, current_date)
+    )
+
+    current_directory = os.getcwd()
+    os.chdir(workspace)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            for ticker_count in price_return_ticker_counts:
+                market = SyntheticMarket(
+                    ticker_count=ticker_count,
+                    day_count=price_return_day_count,
+                    start_date=past_date,
+                    seed=SCALING_SEED,
+                )
+                for date, snapshot in market.snapshots():
+                    if date in (past_date, current_date):
+                        grouped_daily_cache().put(
+                            date=date,
+                            adjusted=POLYGON_API_ADJUSTED,
+                            stock_market_data=snapshot,
+                        )
+                grouped_daily_cache().clear_memory()
+
+                start = time.perf_counter()
+                price_return_for_stocks(
+                    change_window=change_window,
+                    portfolio_size=portfolio_size,
+                    current_date=current_date,
+                    past_date=past_date,
+                )
+                record("price_return_for_stocks", market, start)
+
+            for ticker_count, day_count in backtest_sizes:
+                market = SyntheticMarket(
+                    ticker_count=ticker_count,
+                    day_count=day_count,
+                    seed=SCALING_SEED,
+                )
+                dates, tickers, prices = market.close_matrix()
+                start = time.perf_counter()
+                momentum_backtest(
+                    dates=dates,
+                    tickers=tickers,
+                    prices=prices,
+                    change_window=change_window,
+                    portfolio_size=portfolio_size,
+                )
+                record("momentum_backtest", market, start)
+                del dates, tickers, prices
+
+                warehouse = BarWarehouse(
+                    os.path.join(workspace, f"warehouse-{len(rows)}")
+                )
+                for date, snapshot in market.snapshots():
+                    warehouse.store(date=date, stock_market_data=snapshot)
+                start = time.perf_counter()
+                quantitative_momentum_backtest(
+                    start_date=str(
+                        market.dates[0] + DAYS_PER_CHANGE_WINDOW_YEAR
+                    ),
+                    end_date=str(market.dates[-1]),
+                    portfolio_size=portfolio_size,
+                    change_window=change_window,
+                    warehouse=warehouse,
+                )
+                record("quantitative_momentum_backtest", market, start)
+                shutil.rmtree(warehouse.directory, ignore_errors=True)
+    finally:
+        os.chdir(current_directory)
+        server.stop()
+        shutil.rmtree(workspace, ignore_errors=True)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    scaling_data_frame = scaling_benchmark()
+    print(scaling_data_frame.to_string(index=False))
+    scaling_data_frame.to_csv("Scaling Benchmark.csv", index=False)
@@ -0,0 +1,283 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import math
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from StockMarketData.snapshot_store import (MISSING_INTEGER, SNAPSHOT_FIELDS,
+                                            Snapshot, bar_dtype)
+from Utils.trading_calendar import nyse_calendar
+
+# Share of bars Polygon sends without "vw" and "n", as in the sandbox days
+MISSING_FIELDS_FRACTION = 0.007
+# Polygon stamps a daily bar with the session's 16:00 New York close
+SESSION_CLOSE_HOUR = 16
+EXCHANGE_TIME_ZONE = ZoneInfo("America/New_York")
+
+
+def synthetic_tickers(ticker_count: int) -> np.ndarray:
+    """
+    Provides distinct upper case tickers, AAA, AAB, ... as long as needed
+
+    Args:
+        ticker_count (int): The number of tickers
+
+    Returns:
+        np.ndarray: The tickers
+    """
+    width = max(3, math.ceil(math.log(max(ticker_count, 2), 26)))
+    places = 26 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    indices = np.arange(ticker_count, dtype=np.int64)[:, np.newaxis]
+    letters = (indices // places % 26 + ord("A")).astype(np.uint8)
+    return letters.view(f"S{width}").ravel().astype(str)
+
+
+def session_close_timestamps(dates: np.ndarray) -> np.ndarray:
+    """
+    Provides Polygon's "t" of the daily bars of every date, the session
+    close in Unix milliseconds
+
+    Args:
+        dates (np.ndarray): datetime64[D] dates
+
+    Returns:
+        np.ndarray: The int64 timestamps
+    """
+    return np.array(
+        [
+            int(
+                datetime.combine(
+                    date, datetime.min.time().replace(hour=SESSION_CLOSE_HOUR)
+                )
+                .replace(tzinfo=EXCHANGE_TIME_ZONE)
+                .timestamp()
+                * 1000
+            )
+            for date in dates.astype(object)
+        ],
+        dtype=np.int64,
+    )
+
+
+class SyntheticMarket:
+    """
+    Seeded synthetic stock market, producing grouped-daily responses in
+    Polygon's schema for any number of tickers and trading days
+
+    Every ticker follows its own geometric random walk. Some tickers list
+    after the first day (IPOs) and some stop trading before the last one
+    (delistings), and a few bars of listed tickers are missing on any day,
+    as for thinly traded stocks. Days are generated one at a time from the
+    previous day's closes, so memory grows with the ticker count only and
+    the same seed always yields the same market
+    """
+
+    def __init__(
+        self,
+        ticker_count: int,
+        day_count: int,
+        start_date: str = "2005-01-03",
+        seed: int = 0,
+        ipo_fraction: float = 0.2,
+        delisting_fraction: float = 0.2,
+        missing_bar_fraction: float = 0.01,
+    ):
+        calendar = nyse_calendar()
+        self.dates = calendar.sessions_between(
+            start_date, str(calendar.last_date)
+        )[:day_count]
+        if len(self.dates) < day_count:
+            raise ValueError(
+                f"Only {len(self.dates)} sessions from {start_date} in the calendar"
+            )
+        self.tickers = synthetic_tickers(ticker_count)
+        self.seed = seed
+        self.missing_bar_fraction = missing_bar_fraction
+        self._timestamps = session_close_timestamps(self.dates)
+        self._bar_dtype = bar_dtype(self.tickers.dtype.itemsize // 4)
+
+        random = np.random.default_rng([seed, ticker_count])
+        self.first_days = np.zeros(ticker_count, dtype=np.int64)
+        ipos = random.random(ticker_count) < ipo_fraction
+        self.first_days[ipos] = random.integers(
+            0, day_count, size=ipos.sum()
+        )
+        self.last_days = np.full(ticker_count, day_count - 1, dtype=np.int64)
+        delistings = random.random(ticker_count) < delisting_fraction
+        first_days = self.first_days[delistings]
+        self.last_days[delistings] = first_days + (
+            random.random(len(first_days)) * (day_count - first_days)
+        ).astype(np.int64)
+
+        self._initial_log_closes = random.normal(
+            math.log(20), 1.2, ticker_count
+        )
+        self._drifts = random.normal(0.05, 0.2, ticker_count) / 252
+        self._volatilities = np.exp(
+            random.normal(math.log(0.02), 0.5, ticker_count)
+        )
+        self._volumes = np.exp(
+            random.normal(math.log(1e5), 1.5, ticker_count)
+        )
+        self._reset()
+
+    def _reset(self) -> None:
+        self._day = -1
+        self._log_closes = self._initial_log_closes.copy()
+
+    def _next_snapshot(self) -> Snapshot:
+        self._day += 1
+        day = self._day
+        random = np.random.default_rng([self.seed, len(self.tickers), day])
+        previous_log_closes = self._log_closes
+        self._log_closes = previous_log_closes + (
+            self._drifts
+            + self._volatilities * random.standard_normal(len(self.tickers))
+        )
+
+        rows = np.flatnonzero(
+            (self.first_days <= day)
+            & (day <= self.last_days)
+            & (random.random(len(self.tickers)) >= self.missing_bar_fraction)
+        )
+        volatilities = self._volatilities[rows]
+        close = np.exp(self._log_closes[rows])
+        open_ = np.exp(
+            previous_log_closes[rows]
+            + 0.3 * volatilities * random.standard_normal(len(rows))
+        )
+        high = np.maximum(open_, close) * np.exp(
+            np.abs(0.5 * volatilities * random.standard_normal(len(rows)))
+        )
+        low = np.minimum(open_, close) * np.exp(
+            -np.abs(0.5 * volatilities * random.standard_normal(len(rows)))
+        )
+        volume = np.round(
+            self._volumes[rows]
+            * np.exp(0.5 * random.standard_normal(len(rows)))
+        )
+
+        bars = np.empty(len(rows), dtype=self._bar_dtype)
+        bars["T"] = self.tickers[rows]
+        bars["v"] = volume
+        bars["vw"] = np.round((high + low + close) / 3, 4)
+        bars["o"] = np.round(open_, 4)
+        bars["c"] = np.round(close, 4)
+        bars["h"] = np.round(high, 4)
+        bars["l"] = np.round(low, 4)
+        bars["t"] = self._timestamps[day]
+        bars["n"] = np.maximum(volume // 150, 1)
+        missing_fields = random.random(len(rows)) < MISSING_FIELDS_FRACTION
+        bars["vw"][missing_fields] = np.nan
+        bars["n"][missing_fields] = MISSING_INTEGER
+
+        return Snapshot.from_bars(
+            bars=bars,
+            metadata={
+                "queryCount": len(rows),
+                "resultsCount": len(rows),
+                "adjusted": True,
+                "status": "OK",
+                "request_id": f"{self.seed:08x}{day:08x}",
+                "count": len(rows),
+            },
+        )
+
+    def snapshots(
+        self, start_date: Optional[str] = None
+    ) -> Iterator[Tuple[str, Snapshot]]:
+        """
+        Generates the grouped-daily snapshot of every trading day in order
+
+        Args:
+            start_date (Optional[str]): First date yielded, YYYY-MM-DD, earlier days are still generated but not yielded
+
+        Returns:
+            Iterator[Tuple[str, Snapshot]]: The dates, YYYY-MM-DD, and their snapshots
+        """
+        self._reset()
+        first_day = 0
+        if start_date is not None:
+            first_day = np.searchsorted(
+                self.dates, np.datetime64(start_date, "D")
+            )
+        for day, date in enumerate(self.dates.astype(str).tolist()):
+            snapshot = self._next_snapshot()
+            if day >= first_day:
+                yield date, snapshot
+
+    def snapshot(self, date: str) -> Snapshot:
+        """
+        Provides the grouped-daily snapshot of one trading day
+
+        Days are generated in order, so asking for later and later dates
+        is cheap while going back regenerates from the first day
+
+        Args:
+            date (str): The date, YYYY-MM-DD, a session of the market
+
+        Returns:
+            Snapshot: The snapshot
+
+        Raises:
+            ValueError: If the date is not one of the market's sessions
+        """
+        day = int(np.searchsorted(self.dates, np.datetime64(date, "D")))
+        if day == len(self.dates) or self.dates[day] != np.datetime64(
+            date, "D"
+        ):
+            raise ValueError(
+                f"{date} is not a session of the synthetic market"
+            )
+        if day <= self._day:
+            self._reset()
+        snapshot = None
+        while self._day < day:
+            snapshot = self._next_snapshot()
+        return snapshot
+
+    def grouped_daily(self, date: str) -> dict:
+        """
+        Provides the grouped-daily response of one trading day exactly as
+        Polygon's JSON decodes, a list of bar dictionaries
+
+        Args:
+            date (str): The date, YYYY-MM-DD, a session of the market
+
+        Returns:
+            dict: The decoded grouped-daily response
+        """
+        snapshot = self.snapshot(date)
+        return dict(snapshot.metadata, results=list(snapshot["results"]))
+
+    def close_matrix(
+        self, field: str = "c"
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides the dense (dates x tickers) matrix of a bar field, as
+        BarWarehouse.close_matrix would over the whole market
+
+        Needs 8 bytes per ticker per day
+
+        Args:
+            field (str): The bar field, one of SNAPSHOT_FIELDS except "T"
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            The datetime64[D] dates, the tickers and the matrix, NaN where a
+            ticker has no bar on a date
+        """
+        if field not in SNAPSHOT_FIELDS[1:]:
+            raise ValueError(f"Unknown bar field: {field}")
+        matrix = np.full((len(self.dates), len(self.tickers)), np.nan)
+        for day, (_, snapshot) in enumerate(self.snapshots()):
+            # Bars are generated in ticker order, so a day is a sorted subset
+            columns = np.searchsorted(self.tickers, snapshot.column("T"))
+            matrix[day, columns] = snapshot.column(field)
+        return self.dates.copy(), self.tickers.copy(), matrix
@@ -9,3 +9,244 @@
         7. One-Month price return
         8. One-Month return percentile
 """
+import os
+import sys
+import traceback
+
+sys.path.append(os.path.abspath(".."))
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from QuantitativeMomentumScreener.incremental_returns import \
+    incremental_price_returns
+from QuantitativeMomentumScreener.price_return_engine import (
+    align_past_closes, percent_change, top_k_indices)
+from SPYData.spy_membership import spy_members_on
+from StockMarketData.market_information import stock_market_snapshots
+from StockMarketData.snapshot_store import SANDBOX_SNAPSHOTS, as_snapshot
+from Utils.date_utils import get_dates_in_format_for_change_window
+from Utils.instrumentation import instrumented_run, span, traced
+from Utils.results_writer import portfolio_summary, write_results
+from Utils.share_allocation import allocate_portfolio
+
+HQM_CHANGE_WINDOWS = ("1year", "6month", "3month", "1month")
+SANDBOX_CURRENT_DATE = SANDBOX_SNAPSHOTS["STOCK_MARKET_DAY_0_PRICES"]
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Cross-sectional percentile rank of every value, ties sharing their
+    average rank
+
+    Args:
+        values (np.ndarray): The values to rank
+
+    Returns:
+        np.ndarray: Percentiles between 0 and 100
+    """
+    return pd.Series(values).rank(method="average", pct=True).to_numpy() * 100
+
+
+@traced()
+def high_quality_momentum_scores(
+    current_date: str,
+    spy_only: bool = False,
+    sandbox: bool = False,
+    incremental: bool = False,
+) -> Tuple[pd.DataFrame, list, bool]:
+    """
+    Calculates the one-year, six-month, three-month and one-month price
+    returns of all stocks, their percentiles, and the HQM Score which is the
+    mean of the percentiles
+
+    Windows whose past date has no data are left out of the score
+
+    Args:
+        current_date (str): Current date
+        spy_only (bool): If we need to use only SPY stocks
+        sandbox (bool): If we need to use Sandbox
+        incremental (bool): If we need to update the state of the previous incremental run
+
+    Returns:
+        Tuple[pd.DataFrame, list, bool]:
+        A DataFrame ['Ticker', 'Stock Price', per window 'Price Return over: <window>'
+        and 'Return Percentile over: <window>', 'HQM Score'] sorted by HQM Score
+        and a List of unavailable stocks
+        and a Status
+    """
+
+    spy_stocks_list = []
+    if spy_only:
+        spy_stocks_list, status = spy_members_on(date=current_date)
+        if not status:
+            print("Could not get SPY tickers")
+            return pd.DataFrame(), [], False
+
+    past_dates = {
+        change_window: get_dates_in_format_for_change_window(
+            change_window=change_window, current_date_in_format=current_date
+        )[1]
+        for change_window in HQM_CHANGE_WINDOWS
+    }
+    if incremental:
+        (
+            tickers,
+            current_close,
+            price_returns,
+            unavailable_change_windows,
+            status,
+        ) = incremental_price_returns(
+            current_date=current_date, past_dates=past_dates, sandbox=sandbox
+        )
+        if not status:
+            return pd.DataFrame(), [], False
+        change_windows = list(price_returns)
+        if not change_windows:
+            print("Could not get stock data for any past date")
+            return pd.DataFrame(), [], False
+        if unavailable_change_windows:
+            print(f"Could not get stock data for: {unavailable_change_windows}")
+    else:
+        stock_market_data_by_date, failed_dates = stock_market_snapshots(
+            dates=[current_date, *past_dates.values()], sandbox=sandbox
+        )
+        if current_date in failed_dates:
+            print("Could not get stock data for current date")
+            return pd.DataFrame(), [], False
+        change_windows = [
+            change_window
+            for change_window, past_date in past_dates.items()
+            if past_date not in failed_dates
+        ]
+        if not change_windows:
+            print("Could not get stock data for any past date")
+            return pd.DataFrame(), [], False
+        if failed_dates:
+            print(f"Could not get stock data for: {failed_dates}")
+
+        try:
+            current_snapshot = as_snapshot(
+                stock_market_data_by_date[current_date]
+            )
+            tickers = current_snapshot.column("T")
+            current_close = np.asarray(
+                current_snapshot.column("c"), dtype=np.float64
+            )
+            price_returns = {}
+            for change_window in change_windows:
+                past_close = align_past_closes(
+                    current_stock_market_data=current_snapshot,
+                    past_stock_market_data=stock_market_data_by_date[
+                        past_dates[change_window]
+                    ],
+                )
+                price_returns[change_window] = percent_change(
+                    current_close=current_close, past_close=past_close
+                )
+        except Exception:
+            print(traceback.format_exc())
+            return pd.DataFrame(), [], False
+
+    available = np.ones(len(tickers), dtype=bool)
+    if spy_only:
+        available &= np.isin(tickers, spy_stocks_list)
+    universe = available.copy()
+    for change_window in change_windows:
+        available &= ~np.isnan(price_returns[change_window])
+    stocks_unavailable_in_the_past = tickers[universe & ~available].tolist()
+
+    hqm_data = {
+        "Ticker": tickers[available].astype(object),
+        "Stock Price": current_close[available],
+    }
+    percentiles = []
+    for change_window in change_windows:
+        window_returns = price_returns[change_window][available]
+        window_percentiles = percentile_ranks(window_returns)
+        percentiles.append(window_percentiles)
+        hqm_data[f"Price Return over: {change_window}"] = window_returns
+        hqm_data[f"Return Percentile over: {change_window}"] = np.round(
+            window_percentiles, 2
+        )
+    hqm_scores = np.mean(percentiles, axis=0)
+    hqm_data["HQM Score"] = np.round(hqm_scores, 2)
+
+    order = top_k_indices(values=hqm_scores, k=len(hqm_scores))
+    with span("build_data_frame"):
+        hqm_data_frame = pd.DataFrame(hqm_data).iloc[order]
+        hqm_data_frame.reset_index(drop=True, inplace=True)
+
+    return hqm_data_frame, stocks_unavailable_in_the_past, True
+
+
+@instrumented_run("High Quality Momentum")
+def high_quality_momentum_portfolio(
+    portfolio_amount: float,
+    portfolio_size: int,
+    spy_only: bool = False,
+    sandbox: bool = False,
+    redistribute_cash: bool = False,
+    incremental: bool = False,
+):
+    """
+    High Quality Momentum Portfolio, the portfolio_size stocks with the best
+    HQM Score
+
+    Args:
+        portfolio_amount(float): The '$' amount of the portfolio
+        portfolio_size(int): The number of stocks we want in our portfolio
+        spy_only (bool): If we should use only SPY stocks
+        sandbox(bool): If we should use the sandbox or not
+        redistribute_cash(bool): If the cash left over by rounding should buy extra shares
+        incremental(bool): If the price returns of the previous incremental run should be updated
+
+    Returns:
+        Writes the portfolio suggestion in every RESULTS_FORMATS format
+    """
+
+    current_date = None
+    if sandbox:
+        current_date = SANDBOX_CURRENT_DATE
+    current_date_in_format, _ = get_dates_in_format_for_change_window(
+        change_window="1day", current_date_in_format=current_date
+    )
+
+    hqm_data_frame, stocks_unavailable_in_the_past, status = (
+        high_quality_momentum_scores(
+            current_date=current_date_in_format,
+            spy_only=spy_only,
+            sandbox=sandbox,
+            incremental=incremental,
+        )
+    )
+    if not status:
+        print("Could not get HQM score data")
+        return
+
+    hqm_data_frame = hqm_data_frame[:portfolio_size].copy()
+    capital_invested = allocate_portfolio(
+        portfolio_data_frame=hqm_data_frame,
+        portfolio_amount=portfolio_amount,
+        position_size=portfolio_amount / portfolio_size,
+        redistribute_cash=redistribute_cash,
+    )
+
+    with span("write_results"):
+        write_results(
+            holdings=hqm_data_frame,
+            summary=portfolio_summary(
+                portfolio_amount=portfolio_amount,
+                capital_invested=capital_invested,
+                stocks_unavailable_in_the_past=stocks_unavailable_in_the_past,
+            ),
+            report_name="High Quality Momentum",
+        )
+
+
+if __name__ == "__main__":
+    high_quality_momentum_portfolio(
+        portfolio_amount=10000000, portfolio_size=50, sandbox=True
+    )
@@ -0,0 +1,216 @@
+import os
+import sys
+import traceback
+
+sys.path.append(os.path.abspath(".."))
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from QuantitativeMomentumScreener.price_return_engine import (
+    align_past_closes, percent_change)
+from StockMarketData.bar_warehouse import BarWarehouse
+from StockMarketData.grouped_daily_cache import market_date
+from StockMarketData.market_information import stock_market_snapshots
+from StockMarketData.snapshot_store import as_snapshot
+from StockMarketData.ticker_index import TickerIndex
+from Utils.incremental_state import load_state, save_state, state_path
+from Utils.instrumentation import traced
+from Utils.settings import MOMENTUM_STATE_DIRECTORY
+
+STATE_VALUES = ("current_date", "past_date", "saved_on")
+STATE_ARRAYS = ("tickers", "current_close", "past_close", "percent_change")
+
+
+def momentum_state_path(
+    change_window: str,
+    sandbox: bool = False,
+    state_directory: str = MOMENTUM_STATE_DIRECTORY,
+) -> str:
+    return state_path(
+        name=change_window, sandbox=sandbox, state_directory=state_directory
+    )
+
+
+def load_momentum_state(path: str) -> Optional[dict]:
+    """
+    Provides the state persisted by the last incremental run of a change
+    window
+
+    Args:
+        path (str): The state file
+
+    Returns:
+        Optional[dict]: The STATE_VALUES as str and the STATE_ARRAYS, None
+        when there is no usable state
+    """
+    state = load_state(path, STATE_VALUES + STATE_ARRAYS)
+    if state is not None:
+        for name in STATE_VALUES:
+            state[name] = str(state[name])
+    return state
+
+
+def _changed(closes: np.ndarray, stored_closes: np.ndarray) -> np.ndarray:
+    return ~(
+        (closes == stored_closes)
+        | (np.isnan(closes) & np.isnan(stored_closes))
+    )
+
+
+@traced()
+def incremental_price_returns(
+    current_date: str,
+    past_dates: dict,
+    sandbox: bool = False,
+    state_directory: str = MOMENTUM_STATE_DIRECTORY,
+    warehouse: Optional[BarWarehouse] = None,
+) -> Tuple[np.ndarray, np.ndarray, dict, list, bool]:
+    """
+    Calculates the price return of all stocks over several change windows,
+    updating the returns persisted by the previous run of each window
+
+    Only the current date's snapshot is always loaded. The past closes a
+    window persisted are reused while its past date is unchanged on the
+    same market day, later days loading the shifted past dates from the
+    bar warehouse when stored and fetching them otherwise, both of which
+    revalidate split adjustments daily. The price return is then
+    recalculated only for tickers whose current or past close differs from
+    the persisted ones
+
+    Args:
+        current_date (str): Current date
+        past_dates (dict): Change window to its past date
+        sandbox (bool): If we need to use Sandbox, whose state is kept apart
+        state_directory (str): The directory the per change window state is kept in
+        warehouse (Optional[BarWarehouse]): The bar warehouse, defaults to BAR_WAREHOUSE_DIRECTORY
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, dict, list, bool]:
+        The tickers and their current close in response order,
+        the percent change of every ticker by change window,
+        a List of change windows without data for their past date
+        and a Status
+    """
+
+    current_stock_market_data, failed_dates = stock_market_snapshots(
+        dates=[current_date], sandbox=sandbox
+    )
+    if failed_dates:
+        print("Could not get stock data for current date")
+        return np.array([], dtype=str), np.array([]), {}, [], False
+
+    try:
+        current_snapshot = as_snapshot(current_stock_market_data[current_date])
+        tickers = np.asarray(current_snapshot.column("T"), dtype=str)
+        current_close = np.asarray(
+            current_snapshot.column("c"), dtype=np.float64
+        )
+
+        today = market_date(time.time())
+        states = {}
+        past_closes = {}
+        for change_window, past_date in past_dates.items():
+            state = load_momentum_state(
+                momentum_state_path(
+                    change_window,
+                    sandbox=sandbox,
+                    state_directory=state_directory,
+                )
+            )
+            if state is None:
+                continue
+            rows, found = TickerIndex(state["tickers"]).lookup(tickers)
+            states[change_window] = (state, rows, found)
+            # Past closes loaded on an earlier day may predate a split
+            if (
+                state["past_date"] == past_date
+                and state["saved_on"] == today
+                and found.all()
+            ):
+                past_closes[change_window] = state["past_close"][rows]
+
+        dates = list(
+            dict.fromkeys(
+                past_date
+                for change_window, past_date in past_dates.items()
+                if change_window not in past_closes
+            )
+        )
+        stock_market_data_by_date = {}
+        if not sandbox and dates:
+            warehouse = warehouse or BarWarehouse()
+            for date in dates:
+                if warehouse.has_date(date):
+                    stock_market_data_by_date[date] = warehouse.load(date)
+        fetched_stock_market_data, failed_dates = stock_market_snapshots(
+            dates=[
+                date
+                for date in dates
+                if date not in stock_market_data_by_date
+            ],
+            sandbox=sandbox,
+        )
+        stock_market_data_by_date.update(fetched_stock_market_data)
+
+        price_returns = {}
+        unavailable_change_windows = []
+        for change_window, past_date in past_dates.items():
+            if change_window not in past_closes:
+                if past_date in failed_dates:
+                    unavailable_change_windows.append(change_window)
+                    continue
+                past_closes[change_window] = align_past_closes(
+                    current_stock_market_data=current_snapshot,
+                    past_stock_market_data=stock_market_data_by_date[
+                        past_date
+                    ],
+                )
+            past_close = past_closes[change_window]
+
+            price_return = np.full(len(tickers), np.nan)
+            changed = np.ones(len(tickers), dtype=bool)
+            if change_window in states:
+                state, rows, found = states[change_window]
+                stored_rows = rows[found]
+                changed[found] = _changed(
+                    current_close[found], state["current_close"][stored_rows]
+                ) | _changed(
+                    past_close[found], state["past_close"][stored_rows]
+                )
+                price_return[found] = state["percent_change"][stored_rows]
+            price_return[changed] = percent_change(
+                current_close=current_close[changed],
+                past_close=past_close[changed],
+            )
+            price_returns[change_window] = price_return
+
+            save_state(
+                momentum_state_path(
+                    change_window,
+                    sandbox=sandbox,
+                    state_directory=state_directory,
+                ),
+                {
+                    "current_date": current_date,
+                    "past_date": past_date,
+                    "saved_on": today,
+                    "tickers": tickers,
+                    "current_close": current_close,
+                    "past_close": past_close,
+                    "percent_change": price_return,
+                },
+            )
+    except Exception:
+        print(traceback.format_exc())
+        return np.array([], dtype=str), np.array([]), {}, [], False
+
+    return (
+        tickers,
+        current_close,
+        price_returns,
+        unavailable_change_windows,
+        True,
+    )
@@ -0,0 +1,292 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from QuantitativeMomentumScreener.price_return_engine import top_k_indices
+from SPYData.spy_membership import MembershipIndex, spy_membership
+from StockMarketData.bar_warehouse import BarWarehouse
+from Utils.date_utils import (change_window_dates,
+                              get_dates_in_format_for_change_window)
+
+TRADING_DAYS_PER_YEAR = 252
+MONTHS_PER_REBALANCE = {"monthly": 1, "quarterly": 3}
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """
+    Carries every ticker's last known price forward over dates without a
+    bar, so holdings keep their value through gaps and after delisting
+
+    Args:
+        prices (np.ndarray): (dates x tickers) prices, NaN where missing
+
+    Returns:
+        np.ndarray: The filled prices, NaN only before a ticker's first bar
+    """
+    last_valid_rows = np.where(
+        np.isnan(prices), 0, np.arange(len(prices))[:, np.newaxis]
+    )
+    np.maximum.accumulate(last_valid_rows, axis=0, out=last_valid_rows)
+    return prices[last_valid_rows, np.arange(prices.shape[1])]
+
+
+def rebalance_rows(dates: np.ndarray, rebalance_frequency: str) -> np.ndarray:
+    """
+    Rows of the first trading date of every rebalance period
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[D] trading dates
+        rebalance_frequency (str): 'monthly' or 'quarterly'
+
+    Returns:
+        np.ndarray: The row indices into dates
+    """
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    periods = months // MONTHS_PER_REBALANCE[rebalance_frequency]
+    _, rows = np.unique(periods, return_index=True)
+    return rows
+
+
+def lookback_rows(
+    dates: np.ndarray, rows: np.ndarray, change_window: str
+) -> np.ndarray:
+    """
+    For every rebalance row, the row of the last trading date on or before
+    its change_window past date
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[D] trading dates
+        rows (np.ndarray): The rebalance rows
+        change_window (str): The momentum change window
+
+    Returns:
+        np.ndarray: The past rows, -1 where the window starts before the data
+    """
+    _, past_dates = change_window_dates(dates[rows], change_window)
+    return np.searchsorted(dates, past_dates, side="right") - 1
+
+
+def momentum_backtest(
+    dates: np.ndarray,
+    tickers: np.ndarray,
+    prices: np.ndarray,
+    change_window: str = "1year",
+    portfolio_size: int = 50,
+    rebalance_frequency: str = "monthly",
+    start_date: Optional[str] = None,
+    membership_index: Optional[MembershipIndex] = None,
+    transaction_cost_bps: float = 0.0,
+) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Walk-forward backtest of the quantitative momentum portfolio
+
+    On every rebalance date the portfolio_size tickers with the highest
+    change_window percent change are bought in equal weight and held, with
+    drifting weights, until the next rebalance date. Only the pick of each
+    rebalance loops, the equity curve is computed over whole arrays
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[D] trading dates
+        tickers (np.ndarray): The tickers
+        prices (np.ndarray): (dates x tickers) close prices, NaN where missing
+        change_window (str): The momentum change window
+        portfolio_size (int): The number of stocks held
+        rebalance_frequency (str): 'monthly' or 'quarterly'
+        start_date (Optional[str]): First rebalance date, YYYY-MM-DD, defaults to the first one with a full change window
+        membership_index (Optional[MembershipIndex]): If given, only members on each rebalance date are bought
+        transaction_cost_bps (float): Cost charged on turnover, in basis points
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, dict]:
+        The daily equity curve ['Date', 'Equity', 'Drawdown'],
+        the rebalances ['Date', 'Holdings', 'Turnover'] and summary statistics,
+        all empty if no rebalance date has a full change window
+    """
+    rows = rebalance_rows(dates, rebalance_frequency)
+    past_rows = lookback_rows(dates, rows, change_window)
+    usable = past_rows >= 0
+    if start_date is not None:
+        usable &= dates[rows] >= np.datetime64(start_date, "D")
+    rows, past_rows = rows[usable], past_rows[usable]
+    if len(rows) == 0:
+        return pd.DataFrame(), pd.DataFrame(), {}
+
+    # Equal weights of the selected tickers at every rebalance
+    current_prices, past_prices = prices[rows], prices[past_rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        momentum = current_prices / past_prices - 1
+    momentum[~((current_prices > 0) & (past_prices > 0))] = np.nan
+    if membership_index is not None:
+        momentum[
+            ~membership_index.membership_mask(dates=dates[rows], tickers=tickers)
+        ] = np.nan
+    weights = np.zeros((len(rows), len(tickers)))
+    holdings = []
+    for rebalance, rebalance_momentum in enumerate(momentum):
+        candidates = np.flatnonzero(~np.isnan(rebalance_momentum))
+        selected = candidates[
+            top_k_indices(rebalance_momentum[candidates], portfolio_size)
+        ]
+        if len(selected):
+            weights[rebalance, selected] = 1 / len(selected)
+        holdings.append(tickers[selected].tolist())
+    cash_weights = 1 - weights.sum(axis=1)
+
+    # Only tickers held at some point matter from here on
+    held = np.flatnonzero(weights.any(axis=0))
+    weights = weights[:, held]
+    first_row = rows[0]
+    filled_prices = forward_fill(prices[first_row:, held])
+    rows = rows - first_row
+    period_ends = np.append(rows[1:], len(filled_prices) - 1)
+    period_of_row = (
+        np.searchsorted(rows, np.arange(len(filled_prices)), side="right") - 1
+    )
+
+    # Growth of every holding since its period's rebalance date, both daily
+    # and at the end of each period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = filled_prices / filled_prices[rows[period_of_row]]
+        end_growth = filled_prices[period_ends] / filled_prices[rows]
+    growth = np.nan_to_num(growth, nan=0.0)
+    end_growth = np.nan_to_num(end_growth, nan=0.0)
+    row_growth = (weights[period_of_row] * growth).sum(axis=1) + cash_weights[
+        period_of_row
+    ]
+    period_growth = (weights * end_growth).sum(axis=1) + cash_weights
+
+    # Turnover against the drifted weights of the previous period, the
+    # first rebalance buying from cash
+    drifted_weights = np.zeros_like(weights)
+    drifted_cash_weights = np.ones(len(rows))
+    drifted_weights[1:] = (
+        weights[:-1] * end_growth[:-1] / period_growth[:-1, np.newaxis]
+    )
+    drifted_cash_weights[1:] = cash_weights[:-1] / period_growth[:-1]
+    turnover = 0.5 * (
+        np.abs(weights - drifted_weights).sum(axis=1)
+        + np.abs(cash_weights - drifted_cash_weights)
+    )
+
+    cost_factors = 1 - turnover * transaction_cost_bps / 10000
+    period_start_equity = np.cumprod(
+        cost_factors * np.concatenate([[1.0], period_growth[:-1]])
+    )
+    equity = period_start_equity[period_of_row] * row_growth
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    daily_returns = equity[1:] / equity[:-1] - 1
+    years = (len(equity) - 1) / TRADING_DAYS_PER_YEAR
+    volatility = (
+        daily_returns.std() * np.sqrt(TRADING_DAYS_PER_YEAR)
+        if len(daily_returns)
+        else 0.0
+    )
+    statistics = {
+        "Total Return": float(equity[-1] - 1),
+        "CAGR": float(equity[-1] ** (1 / years) - 1) if years else 0.0,
+        "Annualized Volatility": float(volatility),
+        "Sharpe Ratio": (
+            float(daily_returns.mean() * TRADING_DAYS_PER_YEAR / volatility)
+            if volatility
+            else 0.0
+        ),
+        "Max Drawdown": float(drawdown.min()),
+        "Average Turnover": float(turnover.mean()),
+        "Rebalances": len(rows),
+    }
+
+    equity_dates = dates[first_row:]
+    equity_curve = pd.DataFrame(
+        {"Date": equity_dates, "Equity": equity, "Drawdown": drawdown}
+    )
+    rebalances = pd.DataFrame(
+        {
+            "Date": equity_dates[rows],
+            "Holdings": holdings,
+            "Turnover": turnover,
+        }
+    )
+    return equity_curve, rebalances, statistics
+
+
+def quantitative_momentum_backtest(
+    start_date: str,
+    end_date: str,
+    portfolio_size: int,
+    change_window: str = "1year",
+    rebalance_frequency: str = "monthly",
+    spy_only: bool = False,
+    transaction_cost_bps: float = 0.0,
+    warehouse: Optional[BarWarehouse] = None,
+):
+    """
+    Backtests the Quantitative Momentum Portfolio over the grouped-daily
+    bars stored in the bar warehouse
+
+    The warehouse must hold the bars from change_window before start_date,
+    see BarWarehouse.backfill
+
+    Args:
+        start_date (str): First date, YYYY-MM-DD
+        end_date (str): Last date, YYYY-MM-DD
+        portfolio_size (int): The number of stocks we want in our portfolio
+        change_window (str): The time window to be used to calculate Quantitative Momentum
+        rebalance_frequency (str): 'monthly' or 'quarterly'
+        spy_only (bool): If we should use only stocks in the S&P 500 on each rebalance date
+        transaction_cost_bps (float): Cost charged on turnover, in basis points
+        warehouse (Optional[BarWarehouse]): The bar warehouse, defaults to BAR_WAREHOUSE_DIRECTORY
+
+    Returns:
+        Outputs CSV sheets with the equity curve and the rebalances
+    """
+
+    warehouse = warehouse or BarWarehouse()
+    _, lookback_start_date = get_dates_in_format_for_change_window(
+        change_window=change_window, current_date_in_format=start_date
+    )
+    dates, tickers, prices = warehouse.close_matrix(
+        start_date=lookback_start_date, end_date=end_date
+    )
+    if not len(dates):
+        print("No stored bars, backfill the bar warehouse first")
+        return
+
+    membership_index = None
+    if spy_only:
+        membership_index, status = spy_membership()
+        if not status:
+            print("Could not get S&P 500 membership")
+            return
+
+    equity_curve, rebalances, statistics = momentum_backtest(
+        dates=dates,
+        tickers=tickers,
+        prices=prices,
+        change_window=change_window,
+        portfolio_size=portfolio_size,
+        rebalance_frequency=rebalance_frequency,
+        start_date=start_date,
+        membership_index=membership_index,
+        transaction_cost_bps=transaction_cost_bps,
+    )
+    if equity_curve.empty:
+        print("Not enough stored bars for the change window")
+        return
+
+    for statistic, value in statistics.items():
+        print(f"{statistic}: {value}")
+    equity_curve.to_csv(
+        f"Quantitative Momentum Backtest over - S{change_window}.csv",
+        index=False,
+    )
+    rebalances.to_csv(
+        f"Quantitative Momentum Backtest Rebalances over - S{change_window}.csv",
+        index=False,
+    )
@@ -0,0 +1,306 @@
+import os
+import sys
+import traceback
+
+sys.path.append(os.path.abspath(".."))
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from QuantitativeMomentumScreener.high_quality_momentum_screener import \
+    SANDBOX_CURRENT_DATE
+from QuantitativeMomentumScreener.price_return_engine import (
+    align_past_closes, percent_change, top_k_indices)
+from SPYData.spy_membership import spy_members_on
+from StockMarketData.market_information import stock_market_snapshots
+from StockMarketData.snapshot_store import as_snapshot
+from Utils.date_utils import (CHANGE_WINDOWS,
+                              get_dates_in_format_for_change_window)
+from Utils.share_allocation import allocate_shares
+
+DEFAULT_PORTFOLIO_SIZES = (10, 25, 50, 100)
+
+# Arrays attached by every worker process, by name
+_shared_arrays = {}
+
+
+def share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, tuple]:
+    """
+    Copies an array into a new shared memory block
+
+    Args:
+        array (np.ndarray): The array
+
+    Returns:
+        Tuple[shared_memory.SharedMemory, tuple]:
+        The block, to be closed and unlinked by the caller, and the
+        (name, shape, dtype) descriptor other processes attach with
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_shared_arrays(descriptors: dict) -> None:
+    """
+    Worker initializer attaching the shared arrays without copying them
+
+    Args:
+        descriptors (dict): Array name to its share_array descriptor
+
+    Returns:
+        None
+    """
+    for array_name, (block_name, shape, dtype) in descriptors.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_arrays[array_name] = (
+            block,
+            np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf),
+        )
+
+
+def evaluate_parameters(parameters: tuple) -> dict:
+    """
+    Builds the quantitative momentum portfolio for one grid point over the
+    shared arrays
+
+    Args:
+        parameters (tuple): (past close row, change window, past date, portfolio size, spy only, portfolio amount)
+
+    Returns:
+        dict: The summary row of the grid point
+    """
+    (
+        row,
+        change_window,
+        past_date,
+        portfolio_size,
+        spy_only,
+        portfolio_amount,
+    ) = parameters
+    tickers = _shared_arrays["tickers"][1]
+    current_close = _shared_arrays["current_close"][1]
+    past_close = _shared_arrays["past_closes"][1][row]
+
+    universe = np.ones(len(tickers), dtype=bool)
+    if spy_only:
+        universe = _shared_arrays["spy_mask"][1]
+    percentage_change = percent_change(
+        current_close=current_close[universe], past_close=past_close[universe]
+    )
+    available = ~np.isnan(percentage_change)
+    candidates = np.flatnonzero(universe)[available]
+    percentage_change = percentage_change[available]
+    top_indices = top_k_indices(values=percentage_change, k=portfolio_size)
+    top_changes = percentage_change[top_indices]
+
+    _, capital_invested = allocate_shares(
+        stock_prices=current_close[candidates[top_indices]],
+        position_size=portfolio_amount / portfolio_size,
+    )
+    has_stocks = len(top_indices) > 0
+    return {
+        "Change Window": change_window,
+        "Portfolio Size": portfolio_size,
+        "SPY Only": spy_only,
+        "Past Date": past_date,
+        "Stocks Evaluated": len(candidates),
+        "Stocks Unavailable": int(universe.sum()) - len(candidates),
+        "Mean Percent Change": (
+            round(float(top_changes.mean()), 2) if has_stocks else np.nan
+        ),
+        "Median Percent Change": (
+            round(float(np.median(top_changes)), 2) if has_stocks else np.nan
+        ),
+        "Min Percent Change": (
+            float(top_changes.min()) if has_stocks else np.nan
+        ),
+        "Max Percent Change": (
+            float(top_changes.max()) if has_stocks else np.nan
+        ),
+        "Capital Invested": round(capital_invested, 2),
+        "Capital Remaining": round(portfolio_amount - capital_invested, 2),
+        "Tickers": " ".join(tickers[candidates[top_indices]]),
+    }
+
+
+def momentum_parameter_sweep(
+    portfolio_amount: float,
+    change_windows: tuple = CHANGE_WINDOWS,
+    portfolio_sizes: tuple = DEFAULT_PORTFOLIO_SIZES,
+    spy_only_options: tuple = (False, True),
+    current_date: Optional[str] = None,
+    sandbox: bool = False,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, list, bool]:
+    """
+    Evaluates the quantitative momentum portfolio over a grid of change
+    windows, portfolio sizes and spy_only options
+
+    Each snapshot is fetched once. The aligned closes are copied once into
+    shared memory, which a process pool evaluates the grid points over
+
+    Args:
+        portfolio_amount (float): The '$' amount of the portfolio
+        change_windows (tuple): The change windows, defaults to all of them
+        portfolio_sizes (tuple): The portfolio sizes
+        spy_only_options (tuple): The spy_only values
+        current_date (Optional[str]): Current date, defaults to yesterday or the sandbox date
+        sandbox (bool): If we need to use Sandbox
+        max_workers (Optional[int]): The number of worker processes, defaults to the CPU count
+
+    Returns:
+        Tuple[pd.DataFrame, list, bool]:
+        A DataFrame with one row per grid point,
+        a List of change windows without data for their past date
+        and a Status
+    """
+
+    if current_date is None and sandbox:
+        current_date = SANDBOX_CURRENT_DATE
+    current_date, _ = get_dates_in_format_for_change_window(
+        change_window="1day", current_date_in_format=current_date
+    )
+    past_dates = {
+        change_window: get_dates_in_format_for_change_window(
+            change_window=change_window, current_date_in_format=current_date
+        )[1]
+        for change_window in change_windows
+    }
+
+    spy_stocks_list = []
+    if True in spy_only_options:
+        spy_stocks_list, status = spy_members_on(date=current_date)
+        if not status:
+            print("Could not get SPY tickers")
+            return pd.DataFrame(), [], False
+
+    stock_market_data_by_date, failed_dates = stock_market_snapshots(
+        dates=[current_date, *past_dates.values()], sandbox=sandbox
+    )
+    if current_date in failed_dates:
+        print("Could not get stock data for current date")
+        return pd.DataFrame(), [], False
+    unavailable_change_windows = [
+        change_window
+        for change_window, past_date in past_dates.items()
+        if past_date in failed_dates
+    ]
+    change_windows = [
+        change_window
+        for change_window in past_dates
+        if change_window not in unavailable_change_windows
+    ]
+    if unavailable_change_windows:
+        print(f"Could not get stock data for: {unavailable_change_windows}")
+    if not change_windows:
+        return pd.DataFrame(), unavailable_change_windows, False
+
+    try:
+        current_snapshot = as_snapshot(stock_market_data_by_date[current_date])
+        tickers = current_snapshot.column("T")
+        current_close = np.asarray(
+            current_snapshot.column("c"), dtype=np.float64
+        )
+        past_closes = []
+        for change_window in change_windows:
+            past_closes.append(
+                align_past_closes(
+                    current_stock_market_data=current_snapshot,
+                    past_stock_market_data=stock_market_data_by_date[
+                        past_dates[change_window]
+                    ],
+                )
+            )
+    except Exception:
+        print(traceback.format_exc())
+        return pd.DataFrame(), unavailable_change_windows, False
+
+    arrays = {
+        "tickers": np.asarray(tickers, dtype=str),
+        "current_close": current_close,
+        "past_closes": np.stack(past_closes),
+        "spy_mask": np.isin(tickers, spy_stocks_list),
+    }
+    grid = [
+        (
+            row,
+            change_window,
+            past_dates[change_window],
+            portfolio_size,
+            spy_only,
+            portfolio_amount,
+        )
+        for (row, change_window), portfolio_size, spy_only in itertools.product(
+            enumerate(change_windows), portfolio_sizes, spy_only_options
+        )
+    ]
+
+    blocks = []
+    try:
+        descriptors = {}
+        for array_name, array in arrays.items():
+            block, descriptors[array_name] = share_array(array)
+            blocks.append(block)
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=attach_shared_arrays,
+            initargs=(descriptors,),
+        ) as executor:
+            rows = list(
+                executor.map(
+                    evaluate_parameters,
+                    grid,
+                    chunksize=max(len(grid) // (4 * (os.cpu_count() or 1)), 1),
+                )
+            )
+    except Exception:
+        print(traceback.format_exc())
+        return pd.DataFrame(), unavailable_change_windows, False
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    sweep_data_frame = pd.DataFrame(rows)
+    sweep_data_frame.insert(3, "Current Date", current_date)
+    return sweep_data_frame, unavailable_change_windows, True
+
+
+def quantitative_momentum_sweep(
+    portfolio_amount: float,
+    portfolio_sizes: tuple = DEFAULT_PORTFOLIO_SIZES,
+    sandbox: bool = False,
+):
+    """
+    Quantitative Momentum Portfolio for every change window, portfolio size
+    and spy_only option
+
+    Args:
+        portfolio_amount(float): The '$' amount of the portfolio
+        portfolio_sizes(tuple): The numbers of stocks we want in our portfolio
+        sandbox(bool): If we should use the sandbox or not
+
+    Returns:
+        Outputs a CSV sheet with one row per parameter combination
+    """
+
+    sweep_data_frame, _, status = momentum_parameter_sweep(
+        portfolio_amount=portfolio_amount,
+        portfolio_sizes=portfolio_sizes,
+        sandbox=sandbox,
+    )
+    if not status:
+        print("Could not run the parameter sweep")
+        return
+
+    sweep_data_frame.to_csv("Quantitative Momentum Sweep.csv", index=False)
+
+
+if __name__ == "__main__":
+    quantitative_momentum_sweep(portfolio_amount=10000000, sandbox=True)
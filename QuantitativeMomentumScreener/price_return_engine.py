@@ -0,0 +1,112 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+from collections.abc import Mapping
+from typing import Tuple
+
+import numpy as np
+
+from StockMarketData.snapshot_store import as_snapshot
+from Utils.instrumentation import traced
+
+
+@traced()
+def align_closes(
+    current_stock_market_data: Mapping, past_stock_market_data: Mapping
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Joins two grouped-daily responses by ticker
+
+    The result is keyed by the tickers of the current response, in their
+    response order. Tickers missing from the past response get a NaN past
+    close
+
+    Args:
+        current_stock_market_data (Mapping): Grouped-daily response for the current date
+        past_stock_market_data (Mapping): Grouped-daily response for the past date
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        The tickers, their current close and their past close
+    """
+    current_snapshot = as_snapshot(current_stock_market_data)
+    tickers = current_snapshot.column("T")
+    current_close = np.asarray(current_snapshot.column("c"), dtype=np.float64)
+    past_close = align_past_closes(
+        current_stock_market_data=current_snapshot,
+        past_stock_market_data=past_stock_market_data,
+    )
+    return tickers, current_close, past_close
+
+
+@traced()
+def align_past_closes(
+    current_stock_market_data: Mapping, past_stock_market_data: Mapping
+) -> np.ndarray:
+    """
+    Provides the past close of every ticker of the current grouped-daily
+    response, as align_closes does
+
+    The current snapshot's ticker index is built on first use and kept, so
+    aligning several past responses to one current response indexes the
+    current one once
+
+    Args:
+        current_stock_market_data (Mapping): Grouped-daily response for the current date
+        past_stock_market_data (Mapping): Grouped-daily response for the past date
+
+    Returns:
+        np.ndarray: The past closes in the current response's order, NaN where missing
+    """
+    current_snapshot = as_snapshot(current_stock_market_data)
+    past_snapshot = as_snapshot(past_stock_market_data)
+    rows, found = current_snapshot.ticker_index.join(
+        past_snapshot.ticker_index
+    )
+    past_close = np.full(len(rows), np.nan)
+    past_close[found] = past_snapshot.column("c")[rows[found]]
+    return past_close
+
+
+@traced()
+def percent_change(
+    current_close: np.ndarray, past_close: np.ndarray
+) -> np.ndarray:
+    """
+    Percent change from past_close to current_close, rounded to 2 decimals
+
+    Args:
+        current_close (np.ndarray): Current prices
+        past_close (np.ndarray): Past prices, NaN where unavailable
+
+    Returns:
+        np.ndarray: The percent change, NaN where the past price is unavailable
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (current_close - past_close) / past_close * 100
+    change[~(past_close > 0)] = np.nan
+    return np.round(change, 2)
+
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest values, largest first, without sorting the
+    whole array
+
+    Args:
+        values (np.ndarray): The values to rank, without NaNs
+        k (int): The number of indices wanted
+
+    Returns:
+        np.ndarray: Up to k indices into values
+    """
+    k = max(min(k, len(values)), 0)
+    if k == 0:
+        return np.array([], dtype=np.intp)
+    if k < len(values):
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind="stable")]
@@ -4,19 +4,27 @@ import traceback
 
 sys.path.append(os.path.abspath(".."))
 
-import math
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
 
-from SPYData.ticker_symbols import spy_tickers
-from StockMarketData.market_information import (
-    convert_stock_list_to_dictionary, stock_market_stocks)
-from StockMarketData.stock_market_default_year_prices import (
-    STOCK_MARKET_DAY_0_PRICES, STOCK_MARKET_YEAR_AGO_PRICES)
+from QuantitativeMomentumScreener.incremental_returns import \
+    incremental_price_returns
+from QuantitativeMomentumScreener.price_return_engine import (align_closes,
+                                                              percent_change,
+                                                              top_k_indices)
+from SPYData.spy_membership import spy_members_on
+from StockMarketData.market_information import stock_market_stocks
+from StockMarketData.snapshot_store import (SANDBOX_SNAPSHOTS,
+                                            load_sandbox_snapshot)
 from Utils.date_utils import get_dates_in_format_for_change_window
+from Utils.instrumentation import instrumented_run, span, traced
+from Utils.results_writer import portfolio_summary, write_results
+from Utils.share_allocation import allocate_portfolio
 
 
+@traced()
 def price_return_for_stocks(
     change_window: str,
     portfolio_size: int,
@@ -24,11 +32,13 @@ def price_return_for_stocks(
     past_date: str,
     spy_only: bool = False,
     sandbox: bool = False,
+    incremental: bool = False,
 ) -> Tuple[pd.DataFrame, list, bool]:
     """
     Calculates the price return for all stocks between the past_date and current_date
     If sandbox=True, uses sandbox stocks
     If spy_only=True, uses only SPY Stocks
+    If incremental=True, updates the price returns of the previous incremental run
 
     Args:
         change_window (str): Change window
@@ -37,6 +47,7 @@ def price_return_for_stocks(
         current_date (str): Current date
         past_date (str): Past date
         sandbox(bool): If we need to use Sandbox
+        incremental(bool): If we need to update the state of the previous incremental run
 
     Returns:
         Tuple[pd.DataFrame, list, bool]:
@@ -45,144 +56,104 @@ def price_return_for_stocks(
         and a Status
     """
 
-    spy_stocks_set = set()
+    spy_stocks_list = []
     if spy_only:
-        spy_stocks_list, status = spy_tickers()
+        spy_stocks_list, status = spy_members_on(date=current_date)
         if not status:
             print("Could not get SPY tickers")
-            return pd.DataFrame(), False
-        spy_stocks_set = set(spy_stocks_list["Symbol"].to_list())
-
-    stocks_at_current_date = STOCK_MARKET_DAY_0_PRICES
-    stocks_at_past_date = STOCK_MARKET_YEAR_AGO_PRICES
-    if not sandbox:
-        stocks_at_current_date, status = stock_market_stocks(
-            date=current_date, sandbox=sandbox
-        )
-        if not status:
-            print("Could not get stock data for current date")
-            return pd.DataFrame(), False
-        stocks_at_past_date, status = stock_market_stocks(
-            date=past_date, sandbox=sandbox
+            return pd.DataFrame(), [], False
+
+    if incremental:
+        (
+            tickers,
+            current_close,
+            price_returns,
+            unavailable_change_windows,
+            status,
+        ) = incremental_price_returns(
+            current_date=current_date,
+            past_dates={change_window: past_date},
+            sandbox=sandbox,
         )
         if not status:
+            return pd.DataFrame(), [], False
+        if unavailable_change_windows:
             print("Could not get stock data for past date")
-            return pd.DataFrame(), False
+            return pd.DataFrame(), [], False
+        percentage_change = price_returns[change_window]
+    else:
+        if sandbox:
+            stocks_at_current_date = load_sandbox_snapshot(
+                "STOCK_MARKET_DAY_0_PRICES"
+            )
+            stocks_at_past_date = load_sandbox_snapshot(
+                "STOCK_MARKET_YEAR_AGO_PRICES"
+            )
+        else:
+            stocks_at_current_date, status = stock_market_stocks(
+                date=current_date, sandbox=sandbox
+            )
+            if not status:
+                print("Could not get stock data for current date")
+                return pd.DataFrame(), [], False
+            stocks_at_past_date, status = stock_market_stocks(
+                date=past_date, sandbox=sandbox
+            )
+            if not status:
+                print("Could not get stock data for past date")
+                return pd.DataFrame(), [], False
 
-    stocks_at_current_date_dictionary = convert_stock_list_to_dictionary(
-        stock_market_list=stocks_at_current_date["results"]
-    )
-    stocks_at_past_date_dictionary = convert_stock_list_to_dictionary(
-        stock_market_list=stocks_at_past_date["results"]
-    )
-
-    dataframe_columns = [
-        "Ticker",
-        "Stock Price",
-        f"Percent Change over: {change_window}",
-        "Number of Shares to Purchase",
-    ]
-    portfolio_data_frame = pd.DataFrame(columns=dataframe_columns)
-
-    stocks_unavailable_in_the_past = []
-    for key, values in stocks_at_current_date_dictionary.items():
         try:
-            if spy_only and key not in spy_stocks_set:
-                continue
-            if not stocks_at_past_date_dictionary.get(key):
-                stocks_unavailable_in_the_past.append(key)
-                continue
-            past_price = stocks_at_past_date_dictionary[key]["c"]
-            current_price = values["c"]
-            percentage_change = (
-                (current_price - past_price) / past_price
-            ) * 100
-            portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-                key,
-                current_price,
-                round(percentage_change, 2),
-                "N/A",
-            ]
+            tickers, current_close, past_close = align_closes(
+                current_stock_market_data=stocks_at_current_date,
+                past_stock_market_data=stocks_at_past_date,
+            )
         except Exception:
             print(traceback.format_exc())
-            return pd.DataFrame(), False
+            return pd.DataFrame(), [], False
 
-    portfolio_data_frame.sort_values(
-        f"Percent Change over: {change_window}", ascending=False, inplace=True
-    )
-    portfolio_data_frame.reset_index(drop=True, inplace=True)
-    portfolio_data_frame = portfolio_data_frame[:portfolio_size]
-
-    return portfolio_data_frame, stocks_unavailable_in_the_past, True
-
-
-def append_additional_stats(
-    portfolio_data_frame: pd.DataFrame,
-    portfolio_amount: float,
-    capital_invested: float,
-    stocks_unavailable_in_the_past: list,
-) -> None:
-    """
-    Does in place update of the portfolio_data_frame to add additional statistics of the portfolio
-
-    Args:
-        portfolio_data_frame (pd.DataFrame): The DataFrame to be modified
-        portfolio_amount (float): The portfolio amount
-        capital_invested (float): The total capital invested
-        stocks_unavailable_in_the_past (list): The stocks which were unavailable in the past to calculate
-
-    Returns:
-        None
-        In place change to DataFrame
-    """
-
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "",
-        "",
-        "",
-        "",
-    ]
-
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "Total Capital:",
-        portfolio_amount,
-        "",
-        "",
-    ]
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "Capital invested:",
-        round(capital_invested, 2),
-        "",
-        "",
-    ]
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "Capital remaining:",
-        round(portfolio_amount - capital_invested, 2),
-        "",
-        "",
-    ]
+        percentage_change = percent_change(
+            current_close=current_close, past_close=past_close
+        )
 
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "Stocks not available in the past to evaluate (Count):",
-        len(stocks_unavailable_in_the_past),
-        "",
-        "",
-    ]
+    if spy_only:
+        spy_mask = np.isin(tickers, spy_stocks_list)
+        tickers = tickers[spy_mask]
+        current_close = current_close[spy_mask]
+        percentage_change = percentage_change[spy_mask]
+
+    available = ~np.isnan(percentage_change)
+    stocks_unavailable_in_the_past = tickers[~available].tolist()
+
+    tickers = tickers[available]
+    current_close = current_close[available]
+    percentage_change = percentage_change[available]
+    top_indices = top_k_indices(values=percentage_change, k=portfolio_size)
+
+    with span("build_data_frame"):
+        portfolio_data_frame = pd.DataFrame(
+            {
+                "Ticker": tickers[top_indices].astype(object),
+                "Stock Price": current_close[top_indices],
+                f"Percent Change over: {change_window}": percentage_change[
+                    top_indices
+                ],
+                "Number of Shares to Purchase": "N/A",
+            }
+        )
 
-    portfolio_data_frame.loc[len(portfolio_data_frame)] = [
-        "Stocks not available in the past to evaluate (List):",
-        str(stocks_unavailable_in_the_past),
-        "",
-        "",
-    ]
+    return portfolio_data_frame, stocks_unavailable_in_the_past, True
 
 
+@instrumented_run("Quantitative Momentum")
 def quantitative_momentum_portfolio(
     portfolio_amount: float,
     portfolio_size: int,
     change_window: str = "1year",
     spy_only: bool = False,
     sandbox: bool = False,
+    redistribute_cash: bool = False,
+    incremental: bool = False,
 ):
     """
     Quantitative Momentum Portfolio for a given time window
@@ -193,6 +164,8 @@ def quantitative_momentum_portfolio(
         change_window (str): The time window to be used to calculate Quantitative Momentum
         spy_only (bool): If we should use only SPY stocks
         sandbox(bool): If we should use the sandbox or not
+        redistribute_cash(bool): If the cash left over by rounding should buy extra shares
+        incremental(bool): If the price returns of the previous incremental run should be updated
 
         change_window options:
                 'maxChange': 20 year change
@@ -208,11 +181,16 @@ def quantitative_momentum_portfolio(
                 '1day': 1 day change
 
     Returns:
-        Outputs a CSV sheet with the portfolio suggestion
+        Writes the portfolio suggestion in every RESULTS_FORMATS format
     """
 
+    current_date = None
+    if sandbox and incremental:
+        current_date = SANDBOX_SNAPSHOTS["STOCK_MARKET_DAY_0_PRICES"]
     current_date_in_format, past_date_in_format = (
-        get_dates_in_format_for_change_window(change_window=change_window)
+        get_dates_in_format_for_change_window(
+            change_window=change_window, current_date_in_format=current_date
+        )
     )
 
     portfolio_data_frame, stocks_unavailable_in_the_past, status = (
@@ -223,36 +201,33 @@ def quantitative_momentum_portfolio(
             past_date=past_date_in_format,
             spy_only=spy_only,
             sandbox=sandbox,
+            incremental=incremental,
         )
     )
     if not status:
         print("Could not get percent change data")
         return
 
-    capital_invested = 0
-    position_size = portfolio_amount / portfolio_size
-    for index, row in portfolio_data_frame.iterrows():
-        portfolio_data_frame.loc[index, "Number of Shares to Purchase"] = (
-            math.floor(position_size / row["Stock Price"])
-        )
-        capital_invested += round(
-            math.floor(position_size / row["Stock Price"])
-            * row["Stock Price"],
-            2,
-        )
-
-    append_additional_stats(
+    capital_invested = allocate_portfolio(
         portfolio_data_frame=portfolio_data_frame,
         portfolio_amount=portfolio_amount,
-        capital_invested=capital_invested,
-        stocks_unavailable_in_the_past=stocks_unavailable_in_the_past,
+        position_size=portfolio_amount / portfolio_size,
+        redistribute_cash=redistribute_cash,
     )
 
-    portfolio_data_frame.to_csv(
-        f"Quantitative Momentum over - S{change_window}.csv", index=False
-    )
+    with span("write_results"):
+        write_results(
+            holdings=portfolio_data_frame,
+            summary=portfolio_summary(
+                portfolio_amount=portfolio_amount,
+                capital_invested=capital_invested,
+                stocks_unavailable_in_the_past=stocks_unavailable_in_the_past,
+            ),
+            report_name=f"Quantitative Momentum over - S{change_window}",
+        )
 
 
-quantitative_momentum_portfolio(
-    portfolio_amount=10000000, portfolio_size=50, spy_only=True, sandbox=True
-)
+if __name__ == "__main__":
+    quantitative_momentum_portfolio(
+        portfolio_amount=10000000, portfolio_size=50, spy_only=True, sandbox=True
+    )
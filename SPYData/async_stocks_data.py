@@ -0,0 +1,144 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import asyncio
+from collections.abc import Mapping
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from SPYData.constituent_cache import cached_spy_tickers
+from SPYData.stocks_data import collect_market_caps, spy_ticker_market_cap
+from StockMarketData.async_market_information import async_stock_market_stocks
+from Utils.async_utils import run_blocking, run_sync
+from Utils.rate_limiter import RateLimiter
+from Utils.settings import POLYGON_REQUESTS_PER_MINUTE
+
+
+async def async_spy_tickers(
+    force_refresh: bool = False,
+) -> Tuple[pd.DataFrame, bool]:
+    """
+    Awaitable cached_spy_tickers, served from the process wide constituent
+    cache like the synchronous screeners and scraped only when it is stale
+
+    Args:
+        force_refresh (bool): If the list should be scraped regardless of its age
+
+    Returns:
+        Tuple[pd.DataFrame, bool]: A pandas dataframe with a "Symbol" column and a Status
+    """
+    return await run_blocking(cached_spy_tickers, force_refresh=force_refresh)
+
+
+async def async_spy_ticker_market_cap(
+    ticker_symbol: str, sandbox: bool = False
+) -> Tuple[float, bool]:
+    """
+    Awaitable spy_ticker_market_cap, sharing the HTTP client's connection pool
+
+    Args:
+        ticker_symbol (str): The ticker symbol.
+        sandbox(str): If we need to use sandbox.
+
+    Returns:
+        Tuple[float, bool]: The tuple of the Market Capitalization and Status
+    """
+    return await run_blocking(
+        spy_ticker_market_cap, ticker_symbol=ticker_symbol, sandbox=sandbox
+    )
+
+
+async def async_spy_ticker_market_caps(
+    ticker_symbols: list,
+    sandbox: bool = False,
+    requests_per_minute: Optional[int] = POLYGON_REQUESTS_PER_MINUTE,
+) -> Tuple[dict, list, bool]:
+    """
+    Awaitable spy_ticker_market_caps, fanning out one task per ticker
+
+    Args:
+        ticker_symbols (list): The ticker symbols
+        sandbox (bool): If we need to use sandbox
+        requests_per_minute (Optional[int]): Request budget, 0 or None for unlimited
+
+    Returns:
+        Tuple[dict, list, bool]:
+        The Market Capitalization by ticker, the tickers that could not be fetched
+        and a Status which is False only if no market cap could be fetched
+    """
+    rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+
+    def fetch_market_cap(ticker_symbol: str) -> Tuple[float, bool]:
+        if not sandbox:
+            rate_limiter.acquire()
+        return spy_ticker_market_cap(ticker_symbol, sandbox=sandbox)
+
+    results = await asyncio.gather(
+        *(
+            run_blocking(fetch_market_cap, ticker_symbol)
+            for ticker_symbol in ticker_symbols
+        )
+    )
+    return collect_market_caps(ticker_symbols=ticker_symbols, results=results)
+
+
+async def async_spy_market_data(
+    date: str, sandbox: bool = False
+) -> Tuple[Mapping, pd.DataFrame, dict, bool]:
+    """
+    Fetches the grouped-daily snapshot and the S&P 500 constituents
+    concurrently, then the constituents' market caps, in one event loop
+
+    Args:
+        date (str): The date for the stock market data.
+        sandbox (bool): If we need to use sandbox.
+
+    Returns:
+        Tuple[Mapping, pd.DataFrame, dict, bool]:
+        The stock market data, the SPY tickers, the Market Capitalization by
+        ticker and a Status
+    """
+    (stock_market_data, status), (spy_tickers_data_frame, spy_status) = (
+        await asyncio.gather(
+            async_stock_market_stocks(date=date, sandbox=sandbox),
+            async_spy_tickers(),
+        )
+    )
+    if not status:
+        print("Issue getting stock market information")
+        return dict(), pd.DataFrame(), dict(), False
+    if not spy_status:
+        print("SPY tickers not found")
+        return dict(), pd.DataFrame(), dict(), False
+
+    market_caps, failed_ticker_symbols, status = (
+        await async_spy_ticker_market_caps(
+            ticker_symbols=spy_tickers_data_frame["Symbol"].to_list(),
+            sandbox=sandbox,
+        )
+    )
+    if failed_ticker_symbols:
+        print(f"Could not find market cap for: {failed_ticker_symbols}")
+
+    return stock_market_data, spy_tickers_data_frame, market_caps, status
+
+
+def spy_market_data(
+    date: str, sandbox: bool = False
+) -> Tuple[Mapping, pd.DataFrame, dict, bool]:
+    """
+    Blocking wrapper of async_spy_market_data for synchronous callers
+
+    Args:
+        date (str): The date for the stock market data.
+        sandbox (bool): If we need to use sandbox.
+
+    Returns:
+        Tuple[Mapping, pd.DataFrame, dict, bool]:
+        The stock market data, the SPY tickers, the Market Capitalization by
+        ticker and a Status
+    """
+    return run_sync(async_spy_market_data(date=date, sandbox=sandbox))
@@ -0,0 +1,206 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import json
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from SPYData.ticker_symbols import spy_tickers
+from Utils.instrumentation import traced
+from Utils.settings import (SPY_CONSTITUENTS_CACHE_PATH,
+                            SPY_CONSTITUENTS_REVALIDATE_SECONDS)
+
+
+def diff_constituents(
+    previous_symbols: list, current_symbols: list
+) -> Tuple[list, list]:
+    """
+    Provides the symbols added to and removed from the constituent list
+
+    Args:
+        previous_symbols (list): The earlier constituent symbols
+        current_symbols (list): The later constituent symbols
+
+    Returns:
+        Tuple[list, list]: The sorted additions and removals
+    """
+    previous_set, current_set = set(previous_symbols), set(current_symbols)
+    return sorted(current_set - previous_set), sorted(
+        previous_set - current_set
+    )
+
+
+class ConstituentCache:
+    """
+    S&P 500 constituent list persisted as JSON with its fetch timestamp
+
+    The list is scraped again at most once per revalidate_seconds. Every
+    change between two scrapes is appended to the file's change log, and
+    the last good list is served when a scrape fails
+    """
+
+    def __init__(
+        self,
+        path: str = SPY_CONSTITUENTS_CACHE_PATH,
+        revalidate_seconds: float = SPY_CONSTITUENTS_REVALIDATE_SECONDS,
+    ):
+        self.path = path
+        self.revalidate_seconds = revalidate_seconds
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[dict]:
+        """
+        Provides the persisted constituent list
+
+        Args:
+            None
+
+        Returns:
+            Optional[dict]: {"fetched_at", "symbols", "changes"}, None if nothing is persisted
+        """
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save(self, cached: dict) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(file_descriptor, "w") as cache_file:
+            json.dump(cached, cache_file, indent=4)
+        os.replace(temporary_path, self.path)
+
+    def fresh_symbols(self) -> Optional[list]:
+        """
+        Provides the persisted constituent symbols without scraping
+
+        Args:
+            None
+
+        Returns:
+            Optional[list]: The symbols, None when nothing is persisted or the list is older than revalidate_seconds
+        """
+        cached = self.load()
+        if (
+            cached is None
+            or time.time() - cached["fetched_at"] >= self.revalidate_seconds
+        ):
+            return None
+        return cached["symbols"]
+
+    def _record(self, cached: Optional[dict], symbols: list) -> None:
+        changes = [] if cached is None else cached.get("changes", [])
+        if cached is not None:
+            additions, removals = diff_constituents(
+                previous_symbols=cached["symbols"],
+                current_symbols=symbols,
+            )
+            if additions or removals:
+                print(f"S&P 500 additions: {additions} removals: {removals}")
+                changes.append(
+                    {
+                        "detected_at": time.time(),
+                        "additions": additions,
+                        "removals": removals,
+                    }
+                )
+        self._save(
+            {
+                "fetched_at": time.time(),
+                "symbols": symbols,
+                "changes": changes,
+            }
+        )
+
+    def record(self, symbols: list) -> None:
+        """
+        Persists a constituent list scraped elsewhere, as tickers would
+
+        Args:
+            symbols (list): The current constituent symbols
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._record(cached=self.load(), symbols=symbols)
+
+    def tickers(
+        self, force_refresh: bool = False
+    ) -> Tuple[pd.DataFrame, bool]:
+        """
+        Provides all the tickers in the S&P 500 Index, scraping them only
+        when the persisted list is older than revalidate_seconds
+
+        Args:
+            force_refresh (bool): If the list should be scraped regardless of its age
+
+        Returns:
+            Tuple[pd.DataFrame, bool]: A pandas dataframe with a "Symbol" column and a Status
+        """
+        with self._lock:
+            cached = self.load()
+            age_seconds = (
+                float("inf")
+                if cached is None
+                else time.time() - cached["fetched_at"]
+            )
+            if not force_refresh and age_seconds < self.revalidate_seconds:
+                return pd.DataFrame({"Symbol": cached["symbols"]}), True
+
+            spy_ticker_data_frame, status = spy_tickers()
+            if not status:
+                if cached is None:
+                    return pd.DataFrame(), False
+                print(
+                    "Using the S&P 500 constituents fetched at "
+                    f"{time.ctime(cached['fetched_at'])}"
+                )
+                return pd.DataFrame({"Symbol": cached["symbols"]}), True
+
+            self._record(
+                cached=cached,
+                symbols=spy_ticker_data_frame["Symbol"].to_list(),
+            )
+            return spy_ticker_data_frame, True
+
+
+_constituent_cache = ConstituentCache()
+
+
+@traced()
+def cached_spy_tickers(
+    force_refresh: bool = False,
+) -> Tuple[pd.DataFrame, bool]:
+    """
+    Provides all the tickers in the S&P 500 Index from the process wide
+    constituent cache
+
+    Args:
+        force_refresh (bool): If the list should be scraped regardless of its age
+
+    Returns:
+        Tuple[pd.DataFrame, bool]: A pandas dataframe with a "Symbol" column and a Status
+    """
+    return _constituent_cache.tickers(force_refresh=force_refresh)
+
+
+def constituent_cache() -> ConstituentCache:
+    """
+    Provides the process wide constituent cache
+
+    Args:
+        None
+
+    Returns:
+        ConstituentCache: The shared cache
+    """
+    return _constituent_cache
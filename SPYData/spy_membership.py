@@ -0,0 +1,294 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import time
+import traceback
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from SPYData.constituent_cache import constituent_cache
+from SPYData.ticker_symbols import spy_constituent_tables, tickers_from_tables
+from StockMarketData.ticker_index import TickerIndex
+from Utils.settings import (SPY_CONSTITUENTS_REVALIDATE_SECONDS,
+                            SPY_MEMBERSHIP_PATH)
+
+# Open ends of membership intervals
+EARLIEST_DATE = "1957-03-04"
+LATEST_DATE = "9999-12-31"
+
+_membership_indexes = {}
+
+
+def changes_from_tables(tables: list) -> list:
+    """
+    Provides the dated changes from the tables of the S&P 500 page
+
+    Args:
+        tables (list): The tables, see spy_constituent_tables
+
+    Returns:
+        list: (date, added ticker, removed ticker) tuples, newest first,
+        with "" where nothing was added or removed
+    """
+    changes = []
+    for row in tables[1]:
+        try:
+            date = datetime.strptime(row[0], "%B %d, %Y")
+        except (ValueError, IndexError):
+            # Header rows
+            continue
+        changes.append(
+            (date.strftime("%Y-%m-%d"), row[1].strip(), row[3].strip())
+        )
+    changes.sort(key=lambda change: change[0], reverse=True)
+    return changes
+
+
+def spy_membership_changes() -> Tuple[list, bool]:
+    """
+    Provides the dated additions to and removals from the S&P 500 Index
+
+    Args:
+        None
+
+    Returns:
+        Tuple[list, bool]:
+        A List of (date, added ticker, removed ticker) tuples, newest first,
+        with "" where nothing was added or removed, and a Status
+    """
+
+    tables, status = spy_constituent_tables()
+    if not status:
+        return [], False
+    try:
+        return changes_from_tables(tables), True
+    except Exception:
+        print(traceback.format_exc())
+        return [], False
+
+
+def membership_intervals(
+    current_symbols: list, changes: list
+) -> pd.DataFrame:
+    """
+    Rebuilds membership intervals by walking the changes back from the
+    current constituents
+
+    Renames are not in the changes, so a renamed member (FB to META) is a
+    member under its current ticker only and, before the rename, under
+    neither ticker once its original addition predates the rename
+
+    Args:
+        current_symbols (list): The current constituent symbols
+        changes (list): (date, added ticker, removed ticker) tuples
+
+    Returns:
+        pd.DataFrame: Columns ['Ticker', 'Start Date', 'End Date'], a ticker
+        being a member from its start date up to but excluding its end date
+    """
+    open_interval_ends = {symbol: LATEST_DATE for symbol in current_symbols}
+    intervals = []
+    for date, added_symbol, removed_symbol in sorted(
+        changes, key=lambda change: change[0], reverse=True
+    ):
+        if added_symbol and added_symbol in open_interval_ends:
+            intervals.append(
+                (added_symbol, date, open_interval_ends.pop(added_symbol))
+            )
+        if removed_symbol:
+            open_interval_ends[removed_symbol] = date
+    intervals.extend(
+        (symbol, EARLIEST_DATE, end_date)
+        for symbol, end_date in open_interval_ends.items()
+    )
+    return pd.DataFrame(
+        intervals, columns=["Ticker", "Start Date", "End Date"]
+    )
+
+
+class MembershipIndex:
+    """
+    Interval index answering which tickers were S&P 500 members on a date
+
+    Interval boundaries split time into segments, and the members of every
+    segment are precomputed as one row of a (segments x tickers) boolean
+    matrix. A date lookup is a binary search over the boundaries, O(log n)
+    """
+
+    def __init__(self, intervals: pd.DataFrame):
+        self.intervals = intervals
+        tickers = intervals["Ticker"].to_numpy(dtype=str)
+        starts = intervals["Start Date"].to_numpy(dtype="datetime64[D]")
+        ends = intervals["End Date"].to_numpy(dtype="datetime64[D]")
+
+        self.tickers = np.unique(tickers)
+        self._ticker_index = TickerIndex(self.tickers)
+        self._boundaries = np.unique(np.concatenate([starts, ends]))
+
+        columns, _ = self._ticker_index.lookup(tickers)
+        changes = np.zeros(
+            (len(self._boundaries) + 1, len(self.tickers)), dtype=np.int32
+        )
+        np.add.at(
+            changes, (np.searchsorted(self._boundaries, starts), columns), 1
+        )
+        np.add.at(
+            changes, (np.searchsorted(self._boundaries, ends), columns), -1
+        )
+        self._segment_members = np.cumsum(changes, axis=0)[:-1] > 0
+
+    def _segments(self, dates) -> np.ndarray:
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        return np.searchsorted(self._boundaries, dates, side="right") - 1
+
+    def current_members(self) -> set:
+        """
+        Provides the tickers whose membership has not ended
+
+        Args:
+            None
+
+        Returns:
+            set: The member tickers
+        """
+        return set(
+            self.intervals.loc[
+                self.intervals["End Date"] == LATEST_DATE, "Ticker"
+            ]
+        )
+
+    def members_on(self, date: str) -> np.ndarray:
+        """
+        Provides the members on a date
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+
+        Returns:
+            np.ndarray: The member tickers
+        """
+        segment = self._segments([date])[0]
+        if segment < 0:
+            return self.tickers[:0]
+        return self.tickers[self._segment_members[segment]]
+
+    def membership_mask(self, dates, tickers) -> np.ndarray:
+        """
+        Provides a (dates x tickers) mask of membership, for filtering many
+        rebalance dates at once
+
+        Args:
+            dates: The dates, any array-like of YYYY-MM-DD or datetime64
+            tickers: The tickers, any array-like of str
+
+        Returns:
+            np.ndarray: True where the ticker was a member on the date
+        """
+        segments = self._segments(dates)
+        columns, found = self._ticker_index.lookup(tickers)
+        mask = self._segment_members[np.maximum(segments, 0)][:, columns]
+        mask &= found[np.newaxis, :]
+        mask[segments < 0] = False
+        return mask
+
+    def save(self, path: str = SPY_MEMBERSHIP_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.intervals.to_csv(path, index=False)
+
+    @classmethod
+    def load(cls, path: str = SPY_MEMBERSHIP_PATH) -> "MembershipIndex":
+        return cls(pd.read_csv(path, dtype=str))
+
+
+def _stored_membership_index(path: str) -> Optional[MembershipIndex]:
+    if path in _membership_indexes:
+        return _membership_indexes[path]
+    if os.path.exists(path):
+        _membership_indexes[path] = MembershipIndex.load(path)
+        return _membership_indexes[path]
+    return None
+
+
+def _age_seconds(path: str) -> float:
+    try:
+        return time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return float("inf")
+
+
+def spy_membership(
+    force_refresh: bool = False,
+    path: str = SPY_MEMBERSHIP_PATH,
+    revalidate_seconds: float = SPY_CONSTITUENTS_REVALIDATE_SECONDS,
+) -> Tuple[Optional[MembershipIndex], bool]:
+    """
+    Provides the point-in-time S&P 500 membership, rebuilding and
+    persisting it when it is not stored yet, when the stored membership is
+    older than revalidate_seconds or when its current members differ from
+    the constituent cache's list. A rebuild reads the constituents and
+    their changes from one fetch of the S&P 500 page, refreshing the
+    constituent cache too. The stored membership is used when it cannot
+    be rebuilt
+
+    Args:
+        force_refresh (bool): If the membership should be rebuilt from the current list and changes
+        path (str): The CSV the membership intervals are stored in
+        revalidate_seconds (float): Age after which the stored membership is rebuilt
+
+    Returns:
+        Tuple[Optional[MembershipIndex], bool]: The membership index and a Status
+    """
+
+    stored_membership_index = _stored_membership_index(path)
+    if (
+        not force_refresh
+        and stored_membership_index is not None
+        and _age_seconds(path) < revalidate_seconds
+    ):
+        current_symbols = constituent_cache().fresh_symbols()
+        if current_symbols is not None and (
+            stored_membership_index.current_members() == set(current_symbols)
+        ):
+            return stored_membership_index, True
+
+    # The constituents and their changes are tables of the same page
+    tables, status = spy_constituent_tables()
+    if not status:
+        print("Could not get S&P 500 membership")
+        return stored_membership_index, stored_membership_index is not None
+    try:
+        current_symbols = tickers_from_tables(tables)["Symbol"].to_list()
+        changes = changes_from_tables(tables)
+    except Exception:
+        print(traceback.format_exc())
+        return stored_membership_index, stored_membership_index is not None
+    constituent_cache().record(current_symbols)
+
+    membership_index = MembershipIndex(
+        membership_intervals(current_symbols=current_symbols, changes=changes)
+    )
+    membership_index.save(path)
+    _membership_indexes[path] = membership_index
+    return membership_index, True
+
+
+def spy_members_on(date: str) -> Tuple[list, bool]:
+    """
+    Provides the S&P 500 members on a date
+
+    Args:
+        date (str): The date, YYYY-MM-DD
+
+    Returns:
+        Tuple[list, bool]: A List of member tickers and a Status
+    """
+
+    membership_index, status = spy_membership()
+    if not status:
+        return [], False
+    return membership_index.members_on(date).tolist(), True
@@ -4,18 +4,34 @@ import sys
 sys.path.append(os.path.abspath(".."))
 
 import traceback
-from datetime import datetime, timedelta
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import requests
 
-from constants import POLYGON_API_ADJUSTED, POLYGON_API_KEY
+from constants import POLYGON_API_KEY
+from SPYData.constituent_cache import cached_spy_tickers
 from SPYData.market_cap_list import MARKET_CAP
-from SPYData.ticker_symbols import spy_tickers
-from StockMarketData.market_information import (
-    convert_stock_list_to_dictionary, stock_market_stocks)
-from StockMarketData.stock_market_default_prices import SANDBOX_STOCK_MARKET
+from StockMarketData.market_information import tickers_stock_price_data
+from StockMarketData.ticker_index import TickerIndex
+from Utils.http_client import http_client
+from Utils.incremental_state import load_state, save_state, state_path
+from Utils.instrumentation import in_current_run, span, traced
+from Utils.rate_limiter import RateLimiter
+from Utils.settings import (MOMENTUM_STATE_DIRECTORY, POLYGON_BASE_URL,
+                            POLYGON_MAX_WORKERS, POLYGON_REQUESTS_PER_MINUTE)
+
+MARKET_CAP_STATE_NAME = "equal_weight_market_caps"
+MARKET_CAP_STATE_ARRAYS = (
+    "tickers",
+    "stock_price",
+    "market_cap",
+    "requested_on",
+)
+# Persisted market caps are requested again after this many days, so share
+# count changes are picked up
+MARKET_CAP_MAX_AGE_DAYS = np.timedelta64(30, "D")
 
 
 def spy_ticker_market_cap(
@@ -38,11 +54,15 @@ def spy_ticker_market_cap(
     """
 
     if sandbox:
+        if ticker_symbol not in MARKET_CAP:
+            return 0.0, False
         return MARKET_CAP[ticker_symbol], True
     else:
         try:
-            response = requests.get(
-                f"https://api.polygon.io/v3/reference/tickers/{ticker_symbol}?apiKey={POLYGON_API_KEY}"
+            response = http_client().get(
+                f"{POLYGON_BASE_URL}/v3/reference/tickers/{ticker_symbol}",
+                params={"apiKey": POLYGON_API_KEY},
+                endpoint="polygon.ticker_details",
             )
             if response.status_code == 200:
                 json_response = response.json()
@@ -57,61 +77,251 @@ def spy_ticker_market_cap(
             return 0.0, False
 
 
-def spy_stock_data(sandbox: bool = False) -> Tuple[pd.DataFrame, bool]:
+@traced()
+def spy_ticker_market_caps(
+    ticker_symbols: list,
+    sandbox: bool = False,
+    max_workers: int = POLYGON_MAX_WORKERS,
+    requests_per_minute: Optional[int] = POLYGON_REQUESTS_PER_MINUTE,
+) -> Tuple[dict, list, bool]:
+    """
+    Provides the market capitalization for many Ticker symbols at once
+
+    Requests run on a bounded thread pool sharing one pooled session and are
+    throttled to the Polygon plan's requests_per_minute. A failed ticker is
+    reported instead of failing the whole batch
+
+    Args:
+        ticker_symbols (list): The ticker symbols
+        sandbox (bool): If we need to use sandbox
+        max_workers (int): The maximum number of concurrent requests
+        requests_per_minute (Optional[int]): Request budget, 0 or None for unlimited
+
+    Returns:
+        Tuple[dict, list, bool]:
+        The Market Capitalization by ticker, the tickers that could not be fetched
+        and a Status which is False only if no market cap could be fetched
+    """
+
+    if sandbox:
+        results = [
+            spy_ticker_market_cap(ticker_symbol, sandbox=sandbox)
+            for ticker_symbol in ticker_symbols
+        ]
+    else:
+        rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+
+        def fetch_market_cap(ticker_symbol: str) -> Tuple[float, bool]:
+            rate_limiter.acquire()
+            return spy_ticker_market_cap(ticker_symbol, sandbox=sandbox)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(in_current_run(fetch_market_cap), ticker_symbols)
+            )
+
+    return collect_market_caps(ticker_symbols=ticker_symbols, results=results)
+
+
+def collect_market_caps(
+    ticker_symbols: list, results: list
+) -> Tuple[dict, list, bool]:
+    """
+    Splits the market cap results of many Ticker symbols into the market
+    caps found and the tickers that failed
+
+    Args:
+        ticker_symbols (list): The ticker symbols
+        results (list): The (market cap, status) of every ticker symbol, in order
+
+    Returns:
+        Tuple[dict, list, bool]:
+        The Market Capitalization by ticker, the tickers that could not be fetched
+        and a Status which is False only if no market cap could be fetched
+    """
+    market_caps = {}
+    failed_ticker_symbols = []
+    for ticker_symbol, (market_cap, status) in zip(ticker_symbols, results):
+        if status:
+            market_caps[ticker_symbol] = market_cap
+        else:
+            failed_ticker_symbols.append(ticker_symbol)
+
+    return (
+        market_caps,
+        failed_ticker_symbols,
+        bool(market_caps) or not ticker_symbols,
+    )
+
+
+@traced()
+def incremental_spy_ticker_market_caps(
+    ticker_symbols: list,
+    sandbox: bool = False,
+    state_directory: str = MOMENTUM_STATE_DIRECTORY,
+) -> Tuple[dict, list, bool]:
+    """
+    Provides the market capitalization for many Ticker symbols, updating
+    the ones persisted by the previous incremental run
+
+    A persisted market cap is moved by the stock price change since, the
+    share count being taken as unchanged, so only tickers without one, or
+    whose one was requested more than MARKET_CAP_MAX_AGE_DAYS ago, are
+    requested
+
+    Args:
+        ticker_symbols (list): The ticker symbols
+        sandbox (bool): If we need to use sandbox, whose state is kept apart
+        state_directory (str): The directory incremental state is kept in
+
+    Returns:
+        Tuple[dict, list, bool]:
+        The Market Capitalization by ticker, the tickers that could not be fetched
+        and a Status which is False only if no market cap could be fetched
+    """
+
+    (_, _, stock_prices), _, status = tickers_stock_price_data(
+        ticker_symbols=ticker_symbols, sandbox=sandbox
+    )
+    if not status:
+        return spy_ticker_market_caps(
+            ticker_symbols=ticker_symbols, sandbox=sandbox
+        )
+
+    today = np.datetime64("today", "D")
+    path = state_path(
+        name=MARKET_CAP_STATE_NAME,
+        sandbox=sandbox,
+        state_directory=state_directory,
+    )
+    state = load_state(path, MARKET_CAP_STATE_ARRAYS)
+    moved_market_caps = np.full(len(ticker_symbols), np.nan)
+    requested_on = np.full(len(ticker_symbols), today)
+    if state is not None:
+        rows, found = TickerIndex(state["tickers"]).lookup(ticker_symbols)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            moved_market_caps[found] = state["market_cap"][rows[found]] * (
+                stock_prices[found] / state["stock_price"][rows[found]]
+            )
+        requested_on[found] = state["requested_on"][rows[found]]
+        moved_market_caps[
+            today - requested_on > MARKET_CAP_MAX_AGE_DAYS
+        ] = np.nan
+    moved = np.isfinite(moved_market_caps) & (moved_market_caps > 0)
+
+    requested_market_caps, failed_ticker_symbols, _ = spy_ticker_market_caps(
+        ticker_symbols=[
+            ticker_symbol
+            for ticker_symbol, ticker_moved in zip(ticker_symbols, moved)
+            if not ticker_moved
+        ],
+        sandbox=sandbox,
+    )
+    market_caps = {}
+    for position, ticker_symbol in enumerate(ticker_symbols):
+        if moved[position]:
+            market_caps[ticker_symbol] = float(moved_market_caps[position])
+        elif ticker_symbol in requested_market_caps:
+            market_caps[ticker_symbol] = requested_market_caps[ticker_symbol]
+
+    kept = np.array(
+        [ticker_symbol in market_caps for ticker_symbol in ticker_symbols],
+        dtype=bool,
+    )
+    save_state(
+        path,
+        {
+            "tickers": np.array(list(market_caps), dtype=str),
+            "stock_price": stock_prices[kept],
+            "market_cap": np.array(list(market_caps.values())),
+            "requested_on": requested_on[kept],
+        },
+    )
+    return (
+        market_caps,
+        failed_ticker_symbols,
+        bool(market_caps) or not ticker_symbols,
+    )
+
+
+@traced()
+def spy_stock_data(
+    sandbox: bool = False, incremental: bool = False
+) -> Tuple[pd.DataFrame, bool]:
     """
     Provides the SPY stocks data
 
     If, sandbox, the function will return the same values but with fixed
     historical stock prices
 
+    Tickers without a market cap or a price are reported and left out
+
     Defaults to sandbox=False
 
     Args:
         sandbox(str): If we need to use sandbox.
+        incremental(bool): If the market caps of the previous incremental run should be updated instead of requested
 
     Returns:
         Tuple[pd.DataFrame, bool]: The SPY stock data and status
         pd.DataaFrame columns: ['Ticker', 'Stock Price', 'Market Capitalization', 'Number of Shares to Purchase']
     """
 
-    stock_market_data = SANDBOX_STOCK_MARKET
-    if not sandbox:
-        last_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        stock_market_data, status = stock_market_stocks(
-            date=last_date, sandbox=sandbox
+    spy_tickers_data_frame, status = cached_spy_tickers()
+    if not status:
+        print("SPY tickers not found")
+        return pd.DataFrame(), False
+
+    ticker_symbols = spy_tickers_data_frame["Symbol"].to_list()
+    if incremental:
+        market_caps, failed_ticker_symbols, status = (
+            incremental_spy_ticker_market_caps(
+                ticker_symbols=ticker_symbols, sandbox=sandbox
+            )
+        )
+    else:
+        market_caps, failed_ticker_symbols, status = spy_ticker_market_caps(
+            ticker_symbols=ticker_symbols, sandbox=sandbox
         )
-        if not status:
-            print("Issue getting stock market information")
-            return pd.DataFrame(), False
+    if failed_ticker_symbols:
+        print(f"Could not find market cap for: {failed_ticker_symbols}")
+    if not status:
+        return pd.DataFrame(), False
 
-    spy_tickers_data_frame, status = spy_tickers()
+    market_cap_ticker_symbols = list(market_caps)
+    (_, _, stock_prices), missing_price_ticker_symbols, status = (
+        tickers_stock_price_data(
+            ticker_symbols=market_cap_ticker_symbols, sandbox=sandbox
+        )
+    )
+    if missing_price_ticker_symbols:
+        print(
+            f"Could not find stock price for: {missing_price_ticker_symbols}"
+        )
     if not status:
-        print("SPY tickers not found")
+        print("Issue getting stock market information")
         return pd.DataFrame(), False
 
-    dataframe_columns = [
-        "Ticker",
-        "Stock Price",
-        "Market Capitalization",
-        "Number of Shares to Purchase",
+    priced = ~np.isnan(stock_prices)
+    available_ticker_symbols = [
+        ticker_symbol
+        for ticker_symbol, ticker_priced in zip(
+            market_cap_ticker_symbols, priced
+        )
+        if ticker_priced
     ]
-    spy_data_frame = pd.DataFrame(columns=dataframe_columns)
-    stock_market_dictionary = convert_stock_list_to_dictionary(
-        stock_market_list=stock_market_data["results"]
-    )
 
-    for _, row in spy_tickers_data_frame.iterrows():
-        market_cap, status = spy_ticker_market_cap(
-            row["Symbol"], sandbox=sandbox
+    with span("build_data_frame"):
+        spy_data_frame = pd.DataFrame(
+            {
+                "Ticker": available_ticker_symbols,
+                "Stock Price": stock_prices[priced],
+                "Market Capitalization": [
+                    market_caps[ticker_symbol]
+                    for ticker_symbol in available_ticker_symbols
+                ],
+                "Number of Shares to Purchase": "N/A",
+            }
         )
-        if not status:
-            print(f"Could not find market cap for: {row['Symbol']}")
-            return pd.DataFrame(), False
-        spy_data_frame.loc[len(spy_data_frame)] = [
-            row["Symbol"],
-            stock_market_dictionary[row["Symbol"]]["c"],
-            market_cap,
-            "N/A",
-        ]
 
     return spy_data_frame, True
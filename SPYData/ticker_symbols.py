@@ -1,37 +1,79 @@
+import os
+import sys
 import traceback
 from typing import Tuple
 
+sys.path.append(os.path.abspath(".."))
+
 import pandas as pd
-import requests
 
+from Utils.http_client import http_client
+from Utils.instrumentation import traced
+from Utils.settings import WIKITABLE2JSON_BASE_URL
 
-def spy_tickers() -> Tuple[pd.DataFrame, bool]:
+
+@traced()
+def spy_constituent_tables() -> Tuple[list, bool]:
     """
-    Provides all the tickers in the S&P 500 Index
+    Provides the tables of Wikipedia's List of S&P 500 companies, the
+    current constituents first and their dated changes second
 
     Args:
         None
 
     Returns:
-        Tuple[pd.DataFrame, bool]: A pandas dataframe of all the ticker prices and a Status
+        Tuple[list, bool]: A List of tables, each a List of rows, and a Status
     """
 
     try:
-        response = requests.get(
-            "https://www.wikitable2json.com/api/List_of_S%26P_500_companies#S&P_500_component_stocks?table=0"
+        response = http_client().get(
+            f"{WIKITABLE2JSON_BASE_URL}/api/List_of_S%26P_500_companies",
+            endpoint="wikitable2json.spy_constituents",
         )
         if response.status_code == 200:
-            json_response = response.json()
-            headers = json_response[0][0]
-            data = json_response[0][1:]
-            spy_df = pd.DataFrame(data, columns=headers)
-            spy_ticker_df = spy_df[["Symbol"]]
-            return spy_ticker_df, True
+            return response.json(), True
         else:
             print(
                 f"Response from API: {response}\nResponse Code: {response.status_code}"
             )
-            return pd.DataFrame(), False
+            return [], False
+    except Exception:
+        print(traceback.format_exc())
+        return [], False
+
+
+def tickers_from_tables(tables: list) -> pd.DataFrame:
+    """
+    Provides the current constituents from the tables of the S&P 500 page
+
+    Args:
+        tables (list): The tables, see spy_constituent_tables
+
+    Returns:
+        pd.DataFrame: A pandas dataframe with a "Symbol" column
+    """
+    headers = tables[0][0]
+    data = tables[0][1:]
+    spy_df = pd.DataFrame(data, columns=headers)
+    return spy_df[["Symbol"]]
+
+
+def spy_tickers() -> Tuple[pd.DataFrame, bool]:
+    """
+    Provides all the tickers in the S&P 500 Index
+
+    Args:
+        None
+
+    Returns:
+        Tuple[pd.DataFrame, bool]: A pandas dataframe of all the ticker prices and a Status
+    """
+
+    tables, status = spy_constituent_tables()
+    if not status:
+        return pd.DataFrame(), False
+    try:
+        return tickers_from_tables(tables), True
     except Exception:
         print(traceback.format_exc())
         return pd.DataFrame(), False
@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+from collections.abc import Mapping
+from typing import Iterable, Optional, Tuple
+
+from constants import POLYGON_API_ADJUSTED
+from StockMarketData.market_information import (stock_market_stocks,
+                                                ticker_stock_price_data)
+from Utils.async_utils import run_blocking
+
+
+async def async_stock_market_stocks(
+    date: str,
+    sandbox: bool = False,
+    use_cache: bool = True,
+    tickers: Optional[Iterable[str]] = None,
+    adjusted: str = POLYGON_API_ADJUSTED,
+) -> Tuple[Mapping, bool]:
+    """
+    Awaitable stock_market_stocks, sharing the HTTP client's connection pool
+
+    Args:
+        date (str): The date for the stock market data.
+        sandbox (bool): If we need to use sandbox.
+        use_cache (bool): If we can use the grouped-daily cache.
+        tickers (Optional[Iterable[str]]): If given, the tickers to keep.
+        adjusted (str): The Polygon adjusted flag, "true" for split adjusted bars.
+
+    Returns:
+        Tuple[Mapping, bool]: Stock market data and a Status
+    """
+    return await run_blocking(
+        stock_market_stocks,
+        date=date,
+        sandbox=sandbox,
+        use_cache=use_cache,
+        tickers=tickers,
+        adjusted=adjusted,
+    )
+
+
+async def async_ticker_stock_price_data(
+    ticker_symbol: str, sandbox: bool = False
+) -> Tuple[Tuple[float, float, float], bool]:
+    """
+    Awaitable ticker_stock_price_data, sharing the HTTP client's connection pool
+
+    Args:
+        ticker_symbol (str): The ticker symbol.
+        sandbox (bool): If we need to use sandbox.
+
+    Returns:
+        Tuple[Tuple[float, float, float], bool]:
+        The tuple of (low, high, close) stock prices and a Status
+    """
+    return await run_blocking(
+        ticker_stock_price_data, ticker_symbol=ticker_symbol, sandbox=sandbox
+    )
@@ -0,0 +1,354 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import json
+import shutil
+import tempfile
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+
+from constants import POLYGON_API_ADJUSTED
+from StockMarketData.grouped_daily_cache import (is_adjusted,
+                                                 is_incomplete_day,
+                                                 market_date)
+from StockMarketData.market_information import (stock_market_stocks,
+                                                stock_splits)
+from StockMarketData.snapshot_store import (Snapshot, load_snapshot,
+                                            write_snapshot)
+from StockMarketData.ticker_index import TickerIndex
+from Utils.instrumentation import in_current_run
+from Utils.rate_limiter import RateLimiter
+from Utils.settings import (BAR_WAREHOUSE_DIRECTORY, POLYGON_MAX_WORKERS,
+                            POLYGON_REQUESTS_PER_MINUTE)
+from Utils.trading_calendar import nyse_calendar
+
+PARTITION_PREFIX = "date="
+LAYOUT_FILE_NAME = "layout.json"
+SPLITS_FILE_NAME = "splits.json"
+# Partitions hold unadjusted bars, split adjusted when they are read
+LAYOUT = {"bars": "unadjusted"}
+UNADJUSTED = "false"
+PRICE_FIELDS = ("vw", "o", "c", "h", "l")
+
+
+class BarWarehouse:
+    """
+    Local store of grouped-daily bars with one columnar snapshot partition
+    per date, root/date=YYYY-MM-DD/
+
+    Partitions hold unadjusted bars, which never change once a day has
+    closed. When adjusted bars are asked for, every read applies the stock
+    splits executed after the partition's date, the splits being fetched
+    again once per market day, so a new split is reflected in every
+    earlier partition without downloading it again. Partitions written in
+    the older split adjusted layout are ignored and cleared on the next
+    store
+
+    Dates without trading are stored as empty partitions so a backfill does
+    not request them again
+    """
+
+    def __init__(
+        self,
+        directory: str = BAR_WAREHOUSE_DIRECTORY,
+        adjusted: str = POLYGON_API_ADJUSTED,
+    ):
+        self.directory = directory
+        self.adjusted = adjusted
+        self._splits = None
+
+    def _partition_path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{PARTITION_PREFIX}{date}")
+
+    def _has_current_layout(self) -> bool:
+        try:
+            with open(
+                os.path.join(self.directory, LAYOUT_FILE_NAME)
+            ) as layout_file:
+                return json.load(layout_file) == LAYOUT
+        except (OSError, ValueError):
+            return False
+
+    def _ensure_layout(self) -> None:
+        if self._has_current_layout():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for entry in os.listdir(self.directory):
+            if entry.startswith(PARTITION_PREFIX):
+                shutil.rmtree(
+                    os.path.join(self.directory, entry), ignore_errors=True
+                )
+        with open(
+            os.path.join(self.directory, LAYOUT_FILE_NAME), "w"
+        ) as layout_file:
+            json.dump(LAYOUT, layout_file)
+            layout_file.write("\n")
+
+    def has_date(self, date: str) -> bool:
+        return self._has_current_layout() and os.path.isdir(
+            self._partition_path(date)
+        )
+
+    def stored_dates(
+        self, start_date: str = "0000-01-01", end_date: str = "9999-12-31"
+    ) -> list:
+        """
+        Provides the dates stored in the warehouse
+
+        Args:
+            start_date (str): First date, YYYY-MM-DD
+            end_date (str): Last date, YYYY-MM-DD, inclusive
+
+        Returns:
+            list: The sorted dates, YYYY-MM-DD
+        """
+        if not self._has_current_layout():
+            return []
+        dates = [
+            entry[len(PARTITION_PREFIX) :]
+            for entry in os.listdir(self.directory)
+            if entry.startswith(PARTITION_PREFIX)
+        ]
+        return sorted(date for date in dates if start_date <= date <= end_date)
+
+    def store(self, date: str, stock_market_data: Mapping) -> None:
+        """
+        Stores the unadjusted grouped-daily response for a date, replacing
+        any stored one
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+            stock_market_data (Mapping): The unadjusted grouped-daily response or snapshot
+
+        Returns:
+            None
+        """
+        self._ensure_layout()
+        temporary_path = tempfile.mkdtemp(
+            prefix=f".{date}-", dir=self.directory
+        )
+        write_snapshot(stock_market_data, temporary_path)
+        partition_path = self._partition_path(date)
+        shutil.rmtree(partition_path, ignore_errors=True)
+        os.rename(temporary_path, partition_path)
+        # An earlier first date may need splits not fetched yet
+        self._splits = None
+
+    def splits(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides the stock splits executed since the first stored date,
+        fetched again once per market day and kept in SPLITS_FILE_NAME
+
+        When they cannot be fetched the stored splits are used
+
+        Args:
+            None
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            The tickers, execution dates and price factors (split from / split
+            to) of the splits, sorted by execution date
+        """
+        today = market_date(time.time())
+        if self._splits is not None and self._splits[0] == today:
+            return self._splits[1]
+
+        stored_dates = self.stored_dates()
+        since_date = stored_dates[0] if stored_dates else today
+
+        splits_path = os.path.join(self.directory, SPLITS_FILE_NAME)
+        stored_splits = None
+        if os.path.exists(splits_path):
+            with open(splits_path) as splits_file:
+                stored_splits = json.load(splits_file)
+        if (
+            stored_splits is not None
+            and stored_splits["fetched_on"] == today
+            and stored_splits["since_date"] <= since_date
+        ):
+            splits = stored_splits["splits"]
+        else:
+            splits, status = stock_splits(since_date=since_date)
+            if status:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(splits_path, "w") as splits_file:
+                    json.dump(
+                        {
+                            "fetched_on": today,
+                            "since_date": since_date,
+                            "splits": splits,
+                        },
+                        splits_file,
+                    )
+                    splits_file.write("\n")
+            else:
+                print("Could not fetch stock splits, using the stored ones")
+                splits = stored_splits["splits"] if stored_splits else []
+
+        # Polygon also lists announced splits that have not taken effect
+        splits = sorted(
+            (split for split in splits if split[1] <= today),
+            key=lambda split: split[1],
+        )
+        split_arrays = (
+            np.array([split[0] for split in splits], dtype=str),
+            np.array([split[1] for split in splits], dtype=str),
+            np.array(
+                [split[2] / split[3] for split in splits], dtype=np.float64
+            ),
+        )
+        self._splits = (today, split_arrays)
+        return split_arrays
+
+    def _split_adjusted(self, date: str, snapshot: Snapshot) -> Snapshot:
+        tickers, execution_dates, factors = self.splits()
+        later = np.searchsorted(execution_dates, date, side="right")
+        if later == len(execution_dates) or not snapshot.row_count:
+            return snapshot
+
+        # A ticker split more than once after the date takes every factor
+        split_tickers, inverse = np.unique(
+            tickers[later:], return_inverse=True
+        )
+        ticker_factors = np.ones(len(split_tickers))
+        np.multiply.at(ticker_factors, inverse, factors[later:])
+        rows, found = snapshot.ticker_index.lookup(split_tickers)
+        rows, ticker_factors = rows[found], ticker_factors[found]
+
+        columns = dict(snapshot.columns)
+        for field in PRICE_FIELDS:
+            columns[field] = np.array(snapshot.column(field))
+            columns[field][rows] *= ticker_factors
+        columns["v"] = np.array(snapshot.column("v"))
+        columns["v"][rows] /= ticker_factors
+        return Snapshot(columns=columns, metadata=dict(snapshot.metadata))
+
+    def load(self, date: str) -> Snapshot:
+        """
+        Provides the stored snapshot for a date, split adjusted as of today
+        unless the warehouse was opened for unadjusted bars
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+
+        Returns:
+            Snapshot: The memory mapped snapshot, copied where splits adjust it
+        """
+        snapshot = load_snapshot(self._partition_path(date))
+        if not is_adjusted(self.adjusted):
+            return snapshot
+        return self._split_adjusted(date=date, snapshot=snapshot)
+
+    def backfill(
+        self,
+        start_date: str,
+        end_date: str,
+        max_workers: int = POLYGON_MAX_WORKERS,
+        requests_per_minute: Optional[int] = POLYGON_REQUESTS_PER_MINUTE,
+        overwrite: bool = False,
+    ) -> Tuple[list, list]:
+        """
+        Downloads and stores the unadjusted grouped-daily bars for every
+        closed NYSE session in the date range, in parallel
+
+        The current market day is never stored, as its bars may still change
+
+        Args:
+            start_date (str): First date, YYYY-MM-DD
+            end_date (str): Last date, YYYY-MM-DD, inclusive
+            max_workers (int): The maximum number of concurrent requests
+            requests_per_minute (Optional[int]): Request budget, 0 or None for unlimited
+            overwrite (bool): If dates already stored should be downloaded again
+
+        Returns:
+            Tuple[list, list]: The dates stored and the dates that failed
+        """
+        self._ensure_layout()
+        sessions = nyse_calendar().sessions_between(start_date, end_date)
+        dates = [
+            date
+            for date in sessions.astype(str).tolist()
+            if not is_incomplete_day(date)
+            and (overwrite or not self.has_date(date))
+        ]
+        rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+
+        def backfill_date(date: str) -> bool:
+            rate_limiter.acquire()
+            stock_market_data, status = stock_market_stocks(
+                date=date, adjusted=UNADJUSTED
+            )
+            if not status or stock_market_data.get("status") not in (
+                "OK",
+                "DELAYED",
+            ):
+                return False
+            self.store(date=date, stock_market_data=stock_market_data)
+            return True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = list(executor.map(in_current_run(backfill_date), dates))
+
+        stored_dates = [
+            date for date, status in zip(dates, statuses) if status
+        ]
+        failed_dates = [
+            date for date, status in zip(dates, statuses) if not status
+        ]
+        return stored_dates, failed_dates
+
+    def close_matrix(
+        self,
+        start_date: str,
+        end_date: str,
+        tickers: Optional[list] = None,
+        field: str = "c",
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Provides a dense (dates x tickers) matrix of a bar field, the close
+        price by default, over the stored trading dates in the range, every
+        date split adjusted as of today unless the warehouse is unadjusted
+
+        Args:
+            start_date (str): First date, YYYY-MM-DD
+            end_date (str): Last date, YYYY-MM-DD, inclusive
+            tickers (Optional[list]): Columns of the matrix, defaults to every stored ticker
+            field (str): The bar field, one of SNAPSHOT_FIELDS except "T"
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            The datetime64[D] dates, the tickers and the matrix, NaN where a
+            ticker has no bar on a date
+        """
+        snapshots = []
+        for date in self.stored_dates(start_date, end_date):
+            snapshot = self.load(date)
+            if snapshot.row_count:
+                snapshots.append((date, snapshot))
+
+        if tickers is None:
+            ticker_columns = np.unique(
+                np.concatenate(
+                    [snapshot.column("T") for _, snapshot in snapshots]
+                    or [np.array([], dtype=str)]
+                )
+            )
+        else:
+            ticker_columns = np.asarray(tickers, dtype=str)
+        column_index = TickerIndex(ticker_columns)
+
+        matrix = np.full((len(snapshots), len(ticker_columns)), np.nan)
+        for row, (_, snapshot) in enumerate(snapshots):
+            columns, found = column_index.lookup(snapshot.column("T"))
+            matrix[row, columns[found]] = snapshot.column(field)[found]
+
+        dates = np.array(
+            [date for date, _ in snapshots], dtype="datetime64[D]"
+        )
+        return dates, ticker_columns, matrix
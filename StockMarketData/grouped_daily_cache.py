@@ -0,0 +1,198 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from StockMarketData.snapshot_store import (Snapshot, as_snapshot,
+                                            load_snapshot, write_snapshot)
+from Utils.lru_cache import LRUCache
+from Utils.settings import (POLYGON_CACHE_DIRECTORY,
+                            POLYGON_CACHE_MEMORY_ENTRIES,
+                            POLYGON_INCOMPLETE_DAY_TTL_SECONDS)
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+CACHEABLE_STATUSES = ("OK", "DELAYED")
+
+
+def cache_key(date: str, adjusted: str) -> str:
+    """
+    Content address of a grouped-daily request
+
+    Args:
+        date (str): The date of the grouped-daily request, YYYY-MM-DD
+        adjusted (str): The Polygon adjusted flag of the request
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    return hashlib.sha256(
+        f"grouped-daily:{date}:{str(adjusted).lower()}".encode()
+    ).hexdigest()
+
+
+def market_date(timestamp: float) -> str:
+    """
+    Provides the market's calendar date at a Unix time
+
+    Args:
+        timestamp (float): Seconds since the epoch
+
+    Returns:
+        str: The date in the market's timezone, YYYY-MM-DD
+    """
+    return datetime.fromtimestamp(timestamp, MARKET_TIMEZONE).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def is_adjusted(adjusted: str) -> bool:
+    return str(adjusted).lower() == "true"
+
+
+def is_incomplete_day(date: str) -> bool:
+    """
+    If the grouped-daily data for the date may still change, which is the
+    case for the current market day and any later date
+
+    Args:
+        date (str): The date, YYYY-MM-DD
+
+    Returns:
+        bool: True for today or later in the market's timezone
+    """
+    return date >= market_date(time.time())
+
+
+class GroupedDailyCache:
+    """
+    Two level cache of grouped-daily responses keyed by (date, adjusted)
+
+    Responses are kept as columnar snapshots on disk under a directory named
+    by the request's cache_key, and the most recently used snapshots are also
+    kept in memory. Incomplete days expire after incomplete_day_ttl_seconds.
+    Split adjusted closed days expire at the end of the market day they were
+    stored on, as a split rewrites the adjusted bars of every earlier day
+    once it takes effect. Unadjusted closed days never expire
+    """
+
+    def __init__(
+        self,
+        directory: str = POLYGON_CACHE_DIRECTORY,
+        memory_entries: int = POLYGON_CACHE_MEMORY_ENTRIES,
+        incomplete_day_ttl_seconds: float = POLYGON_INCOMPLETE_DAY_TTL_SECONDS,
+    ):
+        self.directory = os.path.join(directory, "grouped_daily")
+        self.incomplete_day_ttl_seconds = incomplete_day_ttl_seconds
+        self._memory = LRUCache(maxsize=memory_entries)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _is_fresh(self, date: str, adjusted: str, stored_at: float) -> bool:
+        if is_incomplete_day(date):
+            return time.time() - stored_at < self.incomplete_day_ttl_seconds
+        if is_adjusted(adjusted):
+            return market_date(stored_at) == market_date(time.time())
+        return True
+
+    def get(self, date: str, adjusted: str) -> Optional[Snapshot]:
+        """
+        Provides the cached grouped-daily snapshot, from memory if possible
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+            adjusted (str): The Polygon adjusted flag
+
+        Returns:
+            Optional[Snapshot]: The snapshot, None if not cached or expired
+        """
+        key = cache_key(date=date, adjusted=adjusted)
+        entry = self._memory.get(key)
+        if entry is not None:
+            snapshot, stored_at = entry
+            if self._is_fresh(
+                date=date, adjusted=adjusted, stored_at=stored_at
+            ):
+                return snapshot
+            self._memory.pop(key)
+
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if not self._is_fresh(
+                date=date, adjusted=adjusted, stored_at=stored_at
+            ):
+                return None
+            snapshot = load_snapshot(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._memory.put(key, (snapshot, stored_at))
+        return snapshot
+
+    def put(
+        self, date: str, adjusted: str, stock_market_data: Mapping
+    ) -> Snapshot:
+        """
+        Stores a grouped-daily response, unless Polygon reported an error
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+            adjusted (str): The Polygon adjusted flag
+            stock_market_data (Mapping): The decoded grouped-daily response
+
+        Returns:
+            Snapshot: The response as a snapshot
+        """
+        snapshot = as_snapshot(stock_market_data)
+        if snapshot.get("status") not in CACHEABLE_STATUSES:
+            return snapshot
+
+        key = cache_key(date=date, adjusted=adjusted)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = tempfile.mkdtemp(
+            prefix=f".{key}-", dir=os.path.dirname(path)
+        )
+        write_snapshot(snapshot, temporary_path)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            # Another writer stored the same response first
+            shutil.rmtree(temporary_path, ignore_errors=True)
+        self._memory.put(key, (snapshot, time.time()))
+        return snapshot
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+
+_grouped_daily_cache = None
+_grouped_daily_cache_lock = threading.Lock()
+
+
+def grouped_daily_cache() -> GroupedDailyCache:
+    """
+    Provides the process wide grouped-daily cache
+
+    Args:
+        None
+
+    Returns:
+        GroupedDailyCache: The shared cache
+    """
+    global _grouped_daily_cache
+    with _grouped_daily_cache_lock:
+        if _grouped_daily_cache is None:
+            _grouped_daily_cache = GroupedDailyCache()
+        return _grouped_daily_cache
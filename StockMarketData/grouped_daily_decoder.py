@@ -0,0 +1,182 @@
+import codecs
+import json
+from array import array
+from typing import Iterable, Optional
+
+import numpy as np
+
+from StockMarketData.snapshot_store import (FLOAT_FIELDS, INTEGER_FIELDS,
+                                            MISSING_INTEGER, Snapshot,
+                                            pack_bars)
+from Utils.instrumentation import traced
+
+# Consumed text is dropped from the buffer once this much has accumulated
+COMPACT_AFTER_CHARACTERS = 1 << 16
+
+WHITESPACE = " \t\n\r"
+
+_START, _KEY, _COLON, _VALUE, _RESULTS, _BAR, _DONE = range(7)
+
+
+class GroupedDailyDecoder:
+    """
+    Incremental decoder of a grouped-daily JSON response
+
+    Bytes are fed as they arrive. Bars of the "results" array are decoded
+    one at a time and appended to typed column buffers, so neither the list
+    of bar dictionaries nor a dictionary keyed by ticker is ever built. Bars
+    of tickers outside the optional ticker set are skipped. Every other key
+    of the response becomes snapshot metadata
+    """
+
+    def __init__(self, tickers: Optional[Iterable[str]] = None):
+        self._tickers = None if tickers is None else set(tickers)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._state = _START
+        self._key = None
+        self._metadata = {}
+        self._ticker_buffer = []
+        self._float_buffers = {field: array("d") for field in FLOAT_FIELDS}
+        self._integer_buffers = {field: array("q") for field in INTEGER_FIELDS}
+
+    def _skip(self, characters: str) -> bool:
+        # Advances past characters, False when the buffer runs out
+        while self._position < len(self._buffer):
+            if self._buffer[self._position] not in characters:
+                return True
+            self._position += 1
+        return False
+
+    def _decode_value(self, complete: bool):
+        # A number running to the end of the buffer may still be cut off
+        value, end = self._json_decoder.raw_decode(self._buffer, self._position)
+        if end == len(self._buffer) and not complete:
+            raise json.JSONDecodeError("Value may continue", self._buffer, end)
+        self._position = end
+        return value
+
+    def _append_bar(self, bar: dict) -> None:
+        if self._tickers is not None and bar["T"] not in self._tickers:
+            return
+        self._ticker_buffer.append(bar["T"])
+        for field, buffer in self._float_buffers.items():
+            buffer.append(bar.get(field, np.nan))
+        for field, buffer in self._integer_buffers.items():
+            buffer.append(int(bar.get(field, MISSING_INTEGER)))
+
+    def _parse(self, complete: bool = False) -> None:
+        try:
+            while self._state != _DONE and self._skip(WHITESPACE):
+                character = self._buffer[self._position]
+                if self._state == _START:
+                    if character != "{":
+                        raise ValueError("Grouped-daily response is not an object")
+                    self._position += 1
+                    self._state = _KEY
+                elif self._state == _KEY:
+                    if character == ",":
+                        self._position += 1
+                    elif character == "}":
+                        self._position += 1
+                        self._state = _DONE
+                    else:
+                        self._key = self._decode_value(complete)
+                        self._state = _COLON
+                elif self._state == _COLON:
+                    if character != ":":
+                        raise ValueError(f"Expected ':' after {self._key!r}")
+                    self._position += 1
+                    self._state = _VALUE
+                    if self._key == "results":
+                        self._state = _RESULTS
+                elif self._state == _RESULTS and character == "[":
+                    self._position += 1
+                    self._state = _BAR
+                elif self._state == _BAR:
+                    if character == ",":
+                        self._position += 1
+                    elif character == "]":
+                        self._position += 1
+                        self._state = _KEY
+                    else:
+                        self._append_bar(self._decode_value(complete))
+                else:
+                    # Any other value, including a null "results"
+                    value = self._decode_value(complete)
+                    if self._key != "results":
+                        self._metadata[self._key] = value
+                    self._state = _KEY
+        except json.JSONDecodeError:
+            if complete:
+                raise
+        if self._position > COMPACT_AFTER_CHARACTERS:
+            self._buffer = self._buffer[self._position :]
+            self._position = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Decodes the bars completed by a chunk of the response body
+
+        Args:
+            chunk (bytes): The next bytes of the response body
+
+        Returns:
+            None
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        self._parse()
+
+    def close(self) -> Snapshot:
+        """
+        Finishes decoding
+
+        Args:
+            None
+
+        Returns:
+            Snapshot: The decoded response
+
+        Raises:
+            ValueError: If the response body was incomplete or malformed
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._parse(complete=True)
+        if self._state != _DONE:
+            raise ValueError("Incomplete grouped-daily response")
+
+        columns = {"T": np.array(self._ticker_buffer, dtype=str)}
+        if not self._ticker_buffer:
+            columns["T"] = np.array([], dtype="U1")
+        for field, buffer in self._float_buffers.items():
+            columns[field] = np.frombuffer(buffer, dtype=np.float64)
+        for field, buffer in self._integer_buffers.items():
+            columns[field] = np.frombuffer(buffer, dtype=np.int64)
+        return Snapshot.from_bars(
+            bars=pack_bars(columns), metadata=self._metadata
+        )
+
+
+@traced()
+def decode_grouped_daily(
+    chunks: Iterable[bytes], tickers: Optional[Iterable[str]] = None
+) -> Snapshot:
+    """
+    Decodes a grouped-daily response body straight into a columnar snapshot
+
+    Args:
+        chunks (Iterable[bytes]): The response body, e.g. response.iter_content()
+        tickers (Optional[Iterable[str]]): If given, only bars of these tickers are kept
+
+    Returns:
+        Snapshot: The decoded response, its metadata as sent by Polygon
+
+    Raises:
+        ValueError: If the response body was incomplete or malformed
+    """
+    decoder = GroupedDailyDecoder(tickers=tickers)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
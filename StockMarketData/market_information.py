@@ -2,14 +2,29 @@ import os
 import random
 import sys
 import traceback
-from typing import Tuple
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
 
 sys.path.append(os.path.abspath(".."))
 
-import requests
+import numpy as np
 
 from constants import POLYGON_API_ADJUSTED, POLYGON_API_KEY
-from StockMarketData.stock_market_default_prices import SANDBOX_STOCK_MARKET
+from StockMarketData.grouped_daily_cache import grouped_daily_cache
+from StockMarketData.grouped_daily_decoder import decode_grouped_daily
+from StockMarketData.snapshot_store import (as_snapshot, load_sandbox_snapshot,
+                                            sandbox_snapshot_for_date,
+                                            select_tickers)
+from Utils.http_client import http_client
+from Utils.instrumentation import in_current_run, increment, traced
+from Utils.rate_limiter import RateLimiter
+from Utils.settings import (POLYGON_BASE_URL, POLYGON_MAX_WORKERS,
+                            POLYGON_REQUESTS_PER_MINUTE)
+from Utils.trading_calendar import nyse_calendar
+
+STREAM_CHUNK_BYTES = 1 << 16
+SPLITS_PAGE_SIZE = 1000
 
 
 def convert_stock_list_to_dictionary(stock_market_list: list) -> dict:
@@ -25,31 +40,133 @@ def convert_stock_list_to_dictionary(stock_market_list: list) -> dict:
     return {stock_data["T"]: stock_data for stock_data in stock_market_list}
 
 
-def stock_market_stocks(date: str, sandbox: bool = False) -> Tuple[dict, bool]:
+@traced()
+def stock_market_stocks(
+    date: str,
+    sandbox: bool = False,
+    use_cache: bool = True,
+    tickers: Optional[Iterable[str]] = None,
+    adjusted: str = POLYGON_API_ADJUSTED,
+) -> Tuple[Mapping, bool]:
     """
     Provides the stock market information for a particular date
     If, sandbox, the function will return the stock market price for a default date
+    If, use_cache, the response is served from and stored in the grouped-daily cache
+    If, tickers, only the bars of those tickers are returned
     Defaults to sandbox=False
 
+    The response body is decoded as it streams in, straight into a columnar
+    snapshot. A ticker filtered response is never stored in the cache
+
     Args:
         date (str): The date for the stock market data.
         sandbox (bool): If we need to use sandbox.
+        use_cache (bool): If we can use the grouped-daily cache.
+        tickers (Optional[Iterable[str]]): If given, the tickers to keep.
+        adjusted (str): The Polygon adjusted flag, "true" for split adjusted bars.
 
     Returns:
-        Tuple[dict, bool]: Stock market data and a Status
+        Tuple[Mapping, bool]: Stock market data and a Status
     """
     if sandbox:
-        return SANDBOX_STOCK_MARKET
+        if tickers is not None:
+            return (
+                select_tickers(
+                    load_sandbox_snapshot("SANDBOX_STOCK_MARKET"), tickers
+                ),
+                True,
+            )
+        return load_sandbox_snapshot("SANDBOX_STOCK_MARKET"), True
+    if use_cache:
+        cached_stock_market_data = grouped_daily_cache().get(
+            date=date, adjusted=adjusted
+        )
+        if cached_stock_market_data is not None:
+            increment("grouped_daily_cache.hits")
+            if tickers is not None:
+                return select_tickers(cached_stock_market_data, tickers), True
+            return cached_stock_market_data, True
+        increment("grouped_daily_cache.misses")
     try:
-        response = requests.get(
-            f"https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{date}?adjusted={POLYGON_API_ADJUSTED}&apiKey={POLYGON_API_KEY}"
+        response = http_client().get(
+            f"{POLYGON_BASE_URL}/v2/aggs/grouped/locale/us/market/stocks/{date}",
+            params={"adjusted": adjusted, "apiKey": POLYGON_API_KEY},
+            endpoint="polygon.grouped_daily",
+            stream=True,
         )
-        return response.json(), True
+        with response:
+            if response.status_code != 200:
+                print(
+                    f"API Response: {response}\nResponse Code: {response.status_code}"
+                )
+                return dict(), False
+            stock_market_data = decode_grouped_daily(
+                response.iter_content(chunk_size=STREAM_CHUNK_BYTES),
+                tickers=tickers,
+            )
+        if use_cache and tickers is None:
+            return (
+                grouped_daily_cache().put(
+                    date=date,
+                    adjusted=adjusted,
+                    stock_market_data=stock_market_data,
+                ),
+                True,
+            )
+        return stock_market_data, True
     except Exception:
         print(traceback.format_exc())
         return dict(), False
 
 
+@traced()
+def stock_splits(since_date: str) -> Tuple[list, bool]:
+    """
+    Provides every stock split executed on or after a date, following
+    Polygon's pagination
+
+    Args:
+        since_date (str): The first execution date, YYYY-MM-DD
+
+    Returns:
+        Tuple[list, bool]: The splits as (ticker, execution date, split from, split to) and a Status
+    """
+    splits = []
+    url = f"{POLYGON_BASE_URL}/v3/reference/splits"
+    params = {
+        "execution_date.gte": since_date,
+        "limit": SPLITS_PAGE_SIZE,
+        "apiKey": POLYGON_API_KEY,
+    }
+    try:
+        while url:
+            response = http_client().get(
+                url, params=params, endpoint="polygon.splits"
+            )
+            if response.status_code != 200:
+                print(
+                    f"API Response: {response}\nResponse Code: {response.status_code}"
+                )
+                return [], False
+            json_response = response.json()
+            splits.extend(
+                (
+                    split["ticker"],
+                    split["execution_date"],
+                    float(split["split_from"]),
+                    float(split["split_to"]),
+                )
+                for split in json_response.get("results", [])
+            )
+            # next_url carries the cursor and every other query parameter
+            url = json_response.get("next_url")
+            params = {"apiKey": POLYGON_API_KEY}
+    except Exception:
+        print(traceback.format_exc())
+        return [], False
+    return splits, True
+
+
 def ticker_stock_price_data(
     ticker_symbol: str, sandbox: bool = False
 ) -> Tuple[Tuple[float, float, float], bool]:
@@ -68,19 +185,28 @@ def ticker_stock_price_data(
     """
 
     if sandbox:
-        sandbox_stocks = SANDBOX_STOCK_MARKET["results"]
-        for sandbox_stock in sandbox_stocks:
-            if sandbox_stock["T"] == ticker_symbol:
-                price_low, price_high, price_close = (
-                    sandbox_stock["l"],
-                    sandbox_stock["h"],
-                    sandbox_stock["c"],
-                )
-        return (price_low, price_high, price_close), True
+        (price_low, price_high, price_close), misses = (
+            load_sandbox_snapshot("SANDBOX_STOCK_MARKET").ticker_prices(
+                [ticker_symbol]
+            )
+        )
+        if misses:
+            print(f"Could not find sandbox stock price for: {ticker_symbol}")
+            return (0.0, 0.0, 0.0), False
+        return (
+            float(price_low[0]),
+            float(price_high[0]),
+            float(price_close[0]),
+        ), True
     else:
         try:
-            response = requests.get(
-                f"https://api.polygon.io/v2/aggs/ticker/{ticker_symbol}/prev?adjusted={POLYGON_API_ADJUSTED}&apiKey={POLYGON_API_KEY}"
+            response = http_client().get(
+                f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker_symbol}/prev",
+                params={
+                    "adjusted": POLYGON_API_ADJUSTED,
+                    "apiKey": POLYGON_API_KEY,
+                },
+                endpoint="polygon.previous_close",
             )
             if response.status_code == 200:
                 json_response = response.json()
@@ -99,3 +225,140 @@ def ticker_stock_price_data(
         except Exception:
             print(traceback.format_exc())
             return (0.0, 0.0, 0.0), False
+
+
+def previous_trading_session() -> str:
+    """
+    Provides the last NYSE session before today
+
+    Args:
+        None
+
+    Returns:
+        str: The date, YYYY-MM-DD
+    """
+    return nyse_calendar().previous_session(
+        str(np.datetime64("today", "D") - 1)
+    )
+
+
+@traced()
+def tickers_stock_price_data(
+    ticker_symbols: list,
+    sandbox: bool = False,
+    date: Optional[str] = None,
+    max_workers: int = POLYGON_MAX_WORKERS,
+    requests_per_minute: Optional[int] = POLYGON_REQUESTS_PER_MINUTE,
+) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], list, bool]:
+    """
+    Provides the previous day's low, high and close price for many Ticker symbols
+
+    The prices come from a single grouped-daily snapshot of the previous
+    day, and only the tickers missing from it are requested one by one,
+    concurrently, through ticker_stock_price_data
+
+    Args:
+        ticker_symbols (list): The ticker symbols.
+        sandbox (bool): If we need to use sandbox.
+        date (Optional[str]): The previous day, YYYY-MM-DD, defaults to the last weekday
+        max_workers (int): The maximum number of concurrent per-ticker requests
+        requests_per_minute (Optional[int]): Request budget, 0 or None for unlimited
+
+    Returns:
+        Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], list, bool]:
+        The (low, high, close) arrays aligned with ticker_symbols, NaN where
+        unavailable, the ticker symbols that could not be priced and a Status
+        which is False only if no ticker could be priced
+    """
+
+    if sandbox:
+        stock_market_data, status = (
+            load_sandbox_snapshot("SANDBOX_STOCK_MARKET"),
+            True,
+        )
+    else:
+        stock_market_data, status = stock_market_stocks(
+            date=date or previous_trading_session(), sandbox=sandbox
+        )
+    if status:
+        (price_low, price_high, price_close), misses = as_snapshot(
+            stock_market_data
+        ).ticker_prices(ticker_symbols)
+    else:
+        price_low, price_high, price_close = (
+            np.full(len(ticker_symbols), np.nan) for _ in range(3)
+        )
+        misses = list(ticker_symbols)
+
+    unavailable_ticker_symbols = misses
+    if misses and not sandbox:
+        rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+
+        def fetch_prices(
+            ticker_symbol: str,
+        ) -> Tuple[Tuple[float, float, float], bool]:
+            rate_limiter.acquire()
+            return ticker_stock_price_data(ticker_symbol, sandbox=sandbox)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(in_current_run(fetch_prices), misses))
+
+        positions = {
+            ticker_symbol: position
+            for position, ticker_symbol in enumerate(ticker_symbols)
+        }
+        unavailable_ticker_symbols = []
+        for ticker_symbol, (prices, status) in zip(misses, results):
+            if not status:
+                unavailable_ticker_symbols.append(ticker_symbol)
+                continue
+            position = positions[ticker_symbol]
+            (
+                price_low[position],
+                price_high[position],
+                price_close[position],
+            ) = prices
+
+    return (
+        (price_low, price_high, price_close),
+        unavailable_ticker_symbols,
+        len(unavailable_ticker_symbols) < len(ticker_symbols)
+        or not ticker_symbols,
+    )
+
+
+@traced()
+def stock_market_snapshots(
+    dates: list, sandbox: bool = False, max_workers: int = POLYGON_MAX_WORKERS
+) -> Tuple[dict, list]:
+    """
+    Provides the grouped-daily data of several dates, fetching each distinct
+    date once and concurrently
+
+    Args:
+        dates (list): The dates, YYYY-MM-DD, duplicates allowed
+        sandbox (bool): If we need to use the bundled sandbox snapshots
+        max_workers (int): The maximum number of concurrent requests
+
+    Returns:
+        Tuple[dict, list]: The stock market data by date and the dates that could not be fetched
+    """
+    unique_dates = list(dict.fromkeys(dates))
+
+    def fetch_date(date: str) -> Tuple[dict, bool]:
+        if sandbox:
+            snapshot = sandbox_snapshot_for_date(date)
+            return snapshot, snapshot is not None
+        return stock_market_stocks(date=date, sandbox=sandbox)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(in_current_run(fetch_date), unique_dates))
+
+    stock_market_data_by_date = {}
+    failed_dates = []
+    for date, (stock_market_data, status) in zip(unique_dates, results):
+        if status:
+            stock_market_data_by_date[date] = stock_market_data
+        else:
+            failed_dates.append(date)
+    return stock_market_data_by_date, failed_dates
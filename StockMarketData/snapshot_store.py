@@ -0,0 +1,431 @@
+import json
+import math
+import os
+from collections.abc import Mapping, Sequence
+from functools import cached_property, lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from StockMarketData.ticker_index import TickerIndex
+
+SNAPSHOT_FIELDS = ("T", "v", "vw", "o", "c", "h", "l", "t", "n")
+FLOAT_FIELDS = ("v", "vw", "o", "c", "h", "l")
+INTEGER_FIELDS = ("t", "n")
+MISSING_INTEGER = -1
+METADATA_FILE_NAME = "metadata.json"
+
+SNAPSHOT_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "snapshots"
+)
+
+# Bundled sandbox snapshots, by the name of the dataset they replace
+SANDBOX_SNAPSHOTS = {
+    "SANDBOX_STOCK_MARKET": "2024-12-16",
+    "STOCK_MARKET_DAY_0_PRICES": "2024-12-18",
+    "STOCK_MARKET_YEAR_AGO_PRICES": "2023-12-18",
+}
+
+
+class SnapshotResults(Sequence):
+    """
+    Read-only "results" view over the columns of a snapshot
+
+    Bars are materialized as the same dictionaries Polygon returns, one at
+    a time, so iterating never holds more than one bar dictionary alive
+    """
+
+    def __init__(self, columns: dict):
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._columns["T"])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("snapshot result index out of range")
+        return _bar_dictionary(
+            [self._columns[field][index].item() for field in SNAPSHOT_FIELDS]
+        )
+
+    def __iter__(self):
+        rows = zip(
+            *(self._columns[field].tolist() for field in SNAPSHOT_FIELDS)
+        )
+        for row in rows:
+            yield _bar_dictionary(row)
+
+
+class SnapshotBars(Mapping):
+    """
+    Read-only ticker to bar dictionary view over a snapshot, the compact
+    replacement for a dictionary of bar dictionaries keyed by ticker
+
+    Lookups go through a ticker to row dictionary built on first use, each
+    bar dictionary being built once, when first looked up, and when a
+    ticker appears more than once its last bar wins
+    """
+
+    def __init__(self, snapshot: "Snapshot"):
+        self._snapshot = snapshot
+        self._bar_dictionaries = {}
+
+    @cached_property
+    def _rows(self) -> dict:
+        tickers = self._snapshot.column("T").tolist()
+        return dict(zip(tickers, range(len(tickers))))
+
+    def __getitem__(self, ticker: str) -> dict:
+        bar = self._bar_dictionaries.get(ticker)
+        if bar is None:
+            bar = self._bar_dictionaries[ticker] = _bar_dictionary(
+                self._snapshot.bars[self._rows[ticker]].item()
+            )
+        return bar
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def bar_dtype(ticker_length: int) -> np.dtype:
+    """
+    Provides the structured dtype of a bar record, its fields in
+    SNAPSHOT_FIELDS order
+
+    Args:
+        ticker_length (int): The length of the longest ticker
+
+    Returns:
+        np.dtype: The record dtype, 8 bytes per numeric field
+    """
+    return np.dtype(
+        [("T", f"U{max(ticker_length, 1)}")]
+        + [(field, np.float64) for field in FLOAT_FIELDS]
+        + [(field, np.int64) for field in INTEGER_FIELDS]
+    )
+
+
+def pack_bars(columns: dict) -> np.ndarray:
+    """
+    Packs per-field arrays into one structured array of bar records
+
+    Args:
+        columns (dict): Field name to np.ndarray, every field of SNAPSHOT_FIELDS
+
+    Returns:
+        np.ndarray: The bar records
+    """
+    tickers = np.asarray(columns["T"], dtype=str)
+    bars = np.empty(
+        len(tickers), dtype=bar_dtype(tickers.dtype.itemsize // 4)
+    )
+    for field in SNAPSHOT_FIELDS:
+        bars[field] = columns[field]
+    return bars
+
+
+class Snapshot(Mapping):
+    """
+    A grouped-daily response held as per-field column arrays
+
+    Behaves like the decoded Polygon JSON response: snapshot["results"]
+    is a lazy sequence of bar dictionaries and every other key comes from
+    the response metadata. snapshot.bars holds the same bars as one
+    structured array and snapshot.by_ticker looks them up by ticker
+
+    In-memory snapshots are built from the structured array, their columns
+    being views of its fields. Snapshots loaded from disk keep one memory
+    mapped array per field and pack their bars only when asked
+    """
+
+    def __init__(
+        self,
+        columns: dict,
+        metadata: dict,
+        bars: Optional[np.ndarray] = None,
+    ):
+        self.columns = columns
+        self.metadata = metadata
+        self._bars = bars
+
+    @classmethod
+    def from_bars(cls, bars: np.ndarray, metadata: dict) -> "Snapshot":
+        """
+        Builds a snapshot over a structured array of bar records
+
+        Args:
+            bars (np.ndarray): Bar records, see bar_dtype
+            metadata (dict): The rest of the grouped-daily response
+
+        Returns:
+            Snapshot: The snapshot, its columns viewing the records
+        """
+        return cls(
+            columns={field: bars[field] for field in SNAPSHOT_FIELDS},
+            metadata=metadata,
+            bars=bars,
+        )
+
+    def __getitem__(self, key: str):
+        if key == "results":
+            return SnapshotResults(self.columns)
+        return self.metadata[key]
+
+    def __iter__(self):
+        yield from self.metadata
+        yield "results"
+
+    def __len__(self) -> int:
+        return len(self.metadata) + 1
+
+    @property
+    def row_count(self) -> int:
+        return len(self.columns["T"])
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        Provides the array for a single bar field
+
+        Args:
+            field (str): One of SNAPSHOT_FIELDS
+
+        Returns:
+            np.ndarray: The column, one value per ticker
+        """
+        return self.columns[field]
+
+    @property
+    def bars(self) -> np.ndarray:
+        """
+        The bars as one structured array, packed on first use if the
+        snapshot is held as separate columns
+        """
+        if self._bars is None:
+            self._bars = pack_bars(self.columns)
+        return self._bars
+
+    @cached_property
+    def ticker_index(self) -> TickerIndex:
+        """
+        The ticker index over this snapshot's rows, built on first use
+        """
+        return TickerIndex(self.column("T"))
+
+    @cached_property
+    def by_ticker(self) -> SnapshotBars:
+        """
+        The bars keyed by ticker, as a read-only mapping of bar dictionaries
+        """
+        return SnapshotBars(self)
+
+    def ticker_prices(
+        self, ticker_symbols: list
+    ) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], list]:
+        """
+        Provides the low, high and close price of many tickers at once
+
+        Args:
+            ticker_symbols (list): The ticker symbols
+
+        Returns:
+            Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], list]:
+            The (low, high, close) arrays aligned with ticker_symbols, NaN for
+            misses, and the ticker symbols not in the snapshot
+        """
+        rows, found = self.ticker_index.lookup(ticker_symbols)
+        prices = []
+        for field in ("l", "h", "c"):
+            field_prices = np.full(len(rows), np.nan)
+            field_prices[found] = self.column(field)[rows[found]]
+            prices.append(field_prices)
+        misses = [
+            ticker_symbol
+            for ticker_symbol, ticker_found in zip(ticker_symbols, found)
+            if not ticker_found
+        ]
+        return tuple(prices), misses
+
+
+def _bar_dictionary(row) -> dict:
+    """
+    Builds a Polygon bar dictionary from a row of column values, dropping
+    the optional fields Polygon omitted for that bar
+
+    Args:
+        row: The values in SNAPSHOT_FIELDS order
+
+    Returns:
+        dict: The bar dictionary
+    """
+    ticker, volume, vwap, open_, close, high, low, timestamp, count = row
+    bar = {"T": ticker, "v": volume}
+    if not math.isnan(vwap):
+        bar["vw"] = vwap
+    bar.update({"o": open_, "c": close, "h": high, "l": low, "t": timestamp})
+    if count != MISSING_INTEGER:
+        bar["n"] = count
+    return bar
+
+
+def columns_from_results(stock_market_list: list) -> dict:
+    """
+    Converts a list of Polygon bar dictionaries into per-field arrays
+
+    Missing "vw" values are stored as NaN and missing "n" values as
+    MISSING_INTEGER
+
+    Args:
+        stock_market_list (list): The "results" list of a grouped-daily response
+
+    Returns:
+        dict: Field name to np.ndarray
+    """
+    tickers = [bar["T"] for bar in stock_market_list]
+    columns = {"T": np.array(tickers, dtype=str)}
+    if not tickers:
+        columns["T"] = np.array([], dtype="U1")
+    for field in FLOAT_FIELDS:
+        columns[field] = np.array(
+            [bar.get(field, np.nan) for bar in stock_market_list],
+            dtype=np.float64,
+        )
+    for field in INTEGER_FIELDS:
+        columns[field] = np.array(
+            [bar.get(field, MISSING_INTEGER) for bar in stock_market_list],
+            dtype=np.int64,
+        )
+    return columns
+
+
+def as_snapshot(stock_market_data: Mapping) -> Snapshot:
+    """
+    Provides a columnar Snapshot for a grouped-daily response, converting
+    a decoded JSON response when needed
+
+    Args:
+        stock_market_data (Mapping): A Snapshot or a decoded grouped-daily response
+
+    Returns:
+        Snapshot: The columnar snapshot
+    """
+    if isinstance(stock_market_data, Snapshot):
+        return stock_market_data
+    metadata = {
+        key: value
+        for key, value in stock_market_data.items()
+        if key != "results"
+    }
+    return Snapshot.from_bars(
+        bars=pack_bars(
+            columns_from_results(stock_market_data.get("results") or [])
+        ),
+        metadata=metadata,
+    )
+
+
+def select_tickers(stock_market_data: Mapping, tickers) -> Snapshot:
+    """
+    Provides the bars of only some tickers, keeping the response metadata
+
+    Args:
+        stock_market_data (Mapping): A Snapshot or a decoded grouped-daily response
+        tickers: The tickers to keep, any iterable of str
+
+    Returns:
+        Snapshot: The selected bars, in their original order
+    """
+    snapshot = as_snapshot(stock_market_data)
+    _, selected = TickerIndex(np.array(list(tickers), dtype=str)).lookup(
+        snapshot.column("T")
+    )
+    return Snapshot.from_bars(
+        bars=snapshot.bars[selected], metadata=dict(snapshot.metadata)
+    )
+
+
+def write_snapshot(stock_market_data: Mapping, path: str) -> None:
+    """
+    Writes a grouped-daily response to disk as one .npy file per field
+    plus a metadata.json holding the rest of the response
+
+    Args:
+        stock_market_data (Mapping): A Snapshot or a decoded grouped-daily response
+        path (str): The snapshot directory
+
+    Returns:
+        None
+    """
+    snapshot = as_snapshot(stock_market_data)
+    os.makedirs(path, exist_ok=True)
+    for field in SNAPSHOT_FIELDS:
+        np.save(
+            os.path.join(path, f"{field}.npy"),
+            np.ascontiguousarray(snapshot.column(field)),
+        )
+    with open(os.path.join(path, METADATA_FILE_NAME), "w") as metadata_file:
+        json.dump(snapshot.metadata, metadata_file, indent=4)
+        metadata_file.write("\n")
+
+
+def load_snapshot(path: str, mmap_mode: Optional[str] = "r") -> Snapshot:
+    """
+    Loads a snapshot written by write_snapshot
+
+    Args:
+        path (str): The snapshot directory
+        mmap_mode (Optional[str]): Passed to np.load, None reads the arrays into memory
+
+    Returns:
+        Snapshot: The columnar snapshot
+    """
+    with open(os.path.join(path, METADATA_FILE_NAME)) as metadata_file:
+        metadata = json.load(metadata_file)
+    columns = {
+        field: np.load(
+            os.path.join(path, f"{field}.npy"), mmap_mode=mmap_mode
+        )
+        for field in SNAPSHOT_FIELDS
+    }
+    return Snapshot(columns=columns, metadata=metadata)
+
+
+@lru_cache(maxsize=None)
+def load_sandbox_snapshot(name: str) -> Snapshot:
+    """
+    Provides one of the bundled sandbox snapshots
+
+    Args:
+        name (str): A key of SANDBOX_SNAPSHOTS
+
+    Returns:
+        Snapshot: The memory mapped snapshot
+    """
+    return load_snapshot(
+        os.path.join(SNAPSHOT_DIRECTORY, SANDBOX_SNAPSHOTS[name])
+    )
+
+
+def sandbox_snapshot_for_date(date: str) -> Optional[Snapshot]:
+    """
+    Provides the bundled sandbox snapshot of a date, if there is one
+
+    Args:
+        date (str): The date, YYYY-MM-DD
+
+    Returns:
+        Optional[Snapshot]: The snapshot, None if no sandbox data is bundled for the date
+    """
+    for name, snapshot_date in SANDBOX_SNAPSHOTS.items():
+        if snapshot_date == date:
+            return load_sandbox_snapshot(name)
+    return None
@@ -0,0 +1,87 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class TickerIndex:
+    """
+    Maps tickers to their row offset in a snapshot's column arrays
+
+    Built once with a single sort, after which a batch of tickers is looked
+    up with one vectorized binary search. When a ticker appears more than
+    once its last row wins, as in convert_stock_list_to_dictionary
+    """
+
+    def __init__(self, tickers: np.ndarray):
+        tickers = np.asarray(tickers, dtype=str)
+        self._order = np.argsort(tickers, kind="stable")
+        self._sorted_tickers = tickers[self._order]
+
+    def __len__(self) -> int:
+        return len(self._sorted_tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return self.row(ticker) is not None
+
+    def lookup(self, tickers) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Provides the row of every ticker
+
+        Args:
+            tickers: The tickers to look up, any array-like of str
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+            The rows, -1 for misses, and a mask of the tickers found
+        """
+        tickers = np.asarray(tickers, dtype=str)
+        if len(self._sorted_tickers) == 0 or len(tickers) == 0:
+            return (
+                np.full(len(tickers), -1, dtype=np.intp),
+                np.zeros(len(tickers), dtype=bool),
+            )
+        positions = (
+            np.searchsorted(self._sorted_tickers, tickers, side="right") - 1
+        )
+        clipped_positions = np.maximum(positions, 0)
+        found = (positions >= 0) & (
+            self._sorted_tickers[clipped_positions] == tickers
+        )
+        rows = np.where(found, self._order[clipped_positions], -1)
+        return rows, found
+
+    def join(self, other: "TickerIndex") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Provides the row in other of every row of this index
+
+        This index's tickers are searched in sorted order, which is faster
+        than looking them up in row order, so when one snapshot is joined
+        to several others its index is built once and joined to each
+
+        Args:
+            other (TickerIndex): The index joined to
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+            Per row of this index, its row in other, -1 for misses, and a
+            mask of the rows found
+        """
+        sorted_rows, sorted_found = other.lookup(self._sorted_tickers)
+        rows = np.empty_like(sorted_rows)
+        rows[self._order] = sorted_rows
+        found = np.empty_like(sorted_found)
+        found[self._order] = sorted_found
+        return rows, found
+
+    def row(self, ticker: str) -> Optional[int]:
+        """
+        Provides the row of a single ticker
+
+        Args:
+            ticker (str): The ticker
+
+        Returns:
+            Optional[int]: The row, None if the ticker is not indexed
+        """
+        rows, found = self.lookup([ticker])
+        return int(rows[0]) if found[0] else None
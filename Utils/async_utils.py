@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable
+
+from Utils.settings import HTTP_POOL_SIZE
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _loop_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(HTTP_POOL_SIZE)
+    return _semaphores[loop]
+
+
+async def run_blocking(function: Callable, *args, **kwargs) -> Any:
+    """
+    Runs a blocking fetcher in a worker thread without blocking the event
+    loop. At most HTTP_POOL_SIZE run at once per loop, matching the shared
+    HTTP client's connection pool
+
+    Args:
+        function (Callable): The blocking function
+        *args: Its positional arguments
+        **kwargs: Its keyword arguments
+
+    Returns:
+        Any: What function returns
+    """
+    async with _loop_semaphore():
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+
+def run_sync(awaitable: Awaitable) -> Any:
+    """
+    Runs a coroutine to completion from synchronous code
+
+    Args:
+        awaitable (Awaitable): The coroutine
+
+    Returns:
+        Any: What the coroutine returns
+    """
+    return asyncio.run(awaitable)
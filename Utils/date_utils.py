@@ -1,17 +1,121 @@
-from datetime import datetime
-from typing import Tuple
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
-from dateutil.relativedelta import relativedelta
+import numpy as np
+
+from Utils.trading_calendar import nyse_calendar
+
+# Change window to how its past date is reached from the current date,
+# ("months", n) and ("days", n) going back n months or days, a day past the
+# end of a shorter month falling on its last day, and ("ytd", 0) going back
+# to January 1st
+CHANGE_WINDOW_OFFSETS = {
+    "maxChange": ("months", 240),
+    "5year": ("months", 60),
+    "1year": ("months", 12),
+    "ytd": ("ytd", 0),
+    "6month": ("months", 6),
+    "3month": ("months", 3),
+    "1month": ("months", 1),
+    "30day": ("days", 30),
+    "15day": ("days", 15),
+    "5day": ("days", 5),
+    "1day": ("days", 1),
+}
+CHANGE_WINDOWS = tuple(CHANGE_WINDOW_OFFSETS)
+
+
+def previous_trading_days(dates) -> np.ndarray:
+    """
+    Provides the last NYSE session on or before every date, dates outside
+    the trading calendar are returned unchanged
+
+    Args:
+        dates: The dates, any array-like of YYYY-MM-DD or datetime64
+
+    Returns:
+        np.ndarray: The datetime64[D] sessions
+    """
+    calendar = nyse_calendar()
+    dates = np.array(dates, dtype="datetime64[D]")
+    in_calendar = (dates >= calendar.sessions[0]) & (
+        dates <= calendar.last_date
+    )
+    dates[in_calendar] = calendar.previous_sessions(dates[in_calendar])
+    return dates
+
+
+def _months_before(dates: np.ndarray, months: int) -> np.ndarray:
+    month_starts = dates.astype("datetime64[M]")
+    days_into_month = dates - month_starts.astype("datetime64[D]")
+    past_months = month_starts - months
+    past_month_lengths = (past_months + 1).astype(
+        "datetime64[D]"
+    ) - past_months.astype("datetime64[D]")
+    return past_months.astype("datetime64[D]") + np.minimum(
+        days_into_month, past_month_lengths - 1
+    )
+
+
+def change_window_dates(
+    current_dates, change_windows
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Provides the (current, past) session pairs of many dates and change
+    windows in one call
+
+    Args:
+        current_dates: The current dates, any array-like of YYYY-MM-DD or datetime64
+        change_windows: The change windows, one or one per current date
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]:
+        The datetime64[D] current and past sessions
+
+    Raises:
+        ValueError: If a change window is unknown
+    """
+    change_windows = np.asarray(change_windows, dtype=str)
+    unique_change_windows, window_of_date = np.unique(
+        change_windows, return_inverse=True
+    )
+    current_dates, window_of_date = np.broadcast_arrays(
+        np.asarray(current_dates, dtype="datetime64[D]"),
+        window_of_date.reshape(change_windows.shape),
+    )
+    current_sessions = previous_trading_days(current_dates)
+    past_dates = np.empty_like(current_sessions)
+
+    for window, change_window in enumerate(unique_change_windows):
+        if change_window not in CHANGE_WINDOW_OFFSETS:
+            raise ValueError(f"Unknown change window: {change_window}")
+        unit, amount = CHANGE_WINDOW_OFFSETS[change_window]
+        in_window = window_of_date == window
+        dates = current_sessions[in_window]
+        if unit == "months":
+            past_dates[in_window] = _months_before(dates, amount)
+        elif unit == "days":
+            past_dates[in_window] = dates - amount
+        else:
+            past_dates[in_window] = dates.astype("datetime64[Y]").astype(
+                "datetime64[D]"
+            )
+
+    return current_sessions, previous_trading_days(past_dates)
 
 
 def get_dates_in_format_for_change_window(
     change_window: str,
+    current_date_in_format: Optional[str] = None,
 ) -> Tuple[str, str]:
     """
     Returns current date and the past date based on the change window
+    Both are NYSE trading sessions, a date falling on a weekend or holiday
+    resolves to the last session before it
 
     Args:
         change_window (str): The change window for the dates
+        current_date_in_format (Optional[str]): The current date, YYYY-MM-DD, defaults to yesterday
 
         change_window options:
                 'maxChange': 20 year change
@@ -27,33 +131,14 @@ def get_dates_in_format_for_change_window(
                 '1day': 1 day change
 
     Returns:
-        Outputs a CSV sheet with the portfolio suggestion
+        Tuple[str, str]: The current date and the past date, YYYY-MM-DD
     """
 
-    current_date = datetime.now() - relativedelta(days=1)
-    current_date_in_format = current_date.strftime("%Y-%m-%d")
-    if change_window == "maxChange":
-        past_date = current_date - relativedelta(years=20)
-    elif change_window == "5year":
-        past_date = current_date - relativedelta(years=5)
-    elif change_window == "1year":
-        past_date = current_date - relativedelta(years=1)
-    elif change_window == "ytd":
-        past_date = datetime(current_date.year, 1, 1)
-    elif change_window == "6month":
-        past_date = current_date - relativedelta(months=6)
-    elif change_window == "3month":
-        past_date = current_date - relativedelta(months=3)
-    elif change_window == "1month":
-        past_date = current_date - relativedelta(months=1)
-    elif change_window == "30day":
-        past_date = current_date - relativedelta(days=30)
-    elif change_window == "15day":
-        past_date = current_date - relativedelta(days=15)
-    elif change_window == "5day":
-        past_date = current_date - relativedelta(days=5)
-    elif change_window == "1day":
-        past_date = current_date - relativedelta(days=1)
-    past_date_in_format = past_date.strftime("%Y-%m-%d")
-
-    return current_date_in_format, past_date_in_format
+    if current_date_in_format is None:
+        current_date_in_format = (
+            datetime.now() - timedelta(days=1)
+        ).strftime("%Y-%m-%d")
+    current_dates, past_dates = change_window_dates(
+        [current_date_in_format], change_window
+    )
+    return str(current_dates[0]), str(past_dates[0])
@@ -0,0 +1,311 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import random
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from Utils.instrumentation import increment, span
+from Utils.settings import (HTTP_BACKOFF_SECONDS, HTTP_CONNECT_TIMEOUT_SECONDS,
+                            HTTP_MAX_RETRIES, HTTP_POOL_SIZE,
+                            HTTP_READ_TIMEOUT_SECONDS)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_BACKOFF_SECONDS = 30.0
+# Latencies kept per endpoint for the percentiles, sampled uniformly from
+# all requests once more were made
+LATENCY_RESERVOIR_SIZE = 1024
+
+
+class RequestsTransport:
+    """
+    Sends requests over one pooled keep-alive requests session
+
+    A transport is anything with this send method, so tests can substitute
+    one that answers from a local fake server or from memory
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[dict],
+        timeout: Tuple[float, float],
+        stream: bool = False,
+    ) -> requests.Response:
+        return self.session.request(
+            method, url, params=params, timeout=timeout, stream=stream
+        )
+
+
+class RequestMetrics:
+    """
+    Thread safe per-endpoint request counts and latencies
+
+    Memory is bounded however many requests are made: counts, totals and
+    the maximum are running values and the latency percentiles come from a
+    uniform sample of reservoir_size latencies per endpoint
+    """
+
+    def __init__(self, reservoir_size: int = LATENCY_RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._requests = {}
+        self._total_seconds = {}
+        self._max_seconds = {}
+        self._latencies = {}
+        self._failures = {}
+        self._retries = {}
+        self._bytes = {}
+
+    def record(
+        self,
+        endpoint: str,
+        latency_seconds: float,
+        failed: bool,
+        retries: int,
+        bytes_received: int,
+    ) -> None:
+        with self._lock:
+            requests = self._requests.get(endpoint, 0) + 1
+            self._requests[endpoint] = requests
+            self._total_seconds[endpoint] = (
+                self._total_seconds.get(endpoint, 0.0) + latency_seconds
+            )
+            self._max_seconds[endpoint] = max(
+                self._max_seconds.get(endpoint, 0.0), latency_seconds
+            )
+            latencies = self._latencies.setdefault(endpoint, [])
+            if len(latencies) < self.reservoir_size:
+                latencies.append(latency_seconds)
+            else:
+                slot = self._random.randrange(requests)
+                if slot < self.reservoir_size:
+                    latencies[slot] = latency_seconds
+            self._failures[endpoint] = self._failures.get(endpoint, 0) + int(
+                failed
+            )
+            self._retries[endpoint] = (
+                self._retries.get(endpoint, 0) + retries
+            )
+            self._bytes[endpoint] = (
+                self._bytes.get(endpoint, 0) + bytes_received
+            )
+        increment(f"http.requests.{endpoint}")
+        increment(f"http.failures.{endpoint}", int(failed))
+        increment(f"http.retries.{endpoint}", retries)
+        increment(f"http.bytes.{endpoint}", bytes_received)
+
+    def add_bytes(self, endpoint: str, bytes_received: int) -> None:
+        with self._lock:
+            self._bytes[endpoint] = (
+                self._bytes.get(endpoint, 0) + bytes_received
+            )
+        increment(f"http.bytes.{endpoint}", bytes_received)
+
+    def summary(self) -> dict:
+        """
+        Provides the request statistics of every endpoint
+
+        Args:
+            None
+
+        Returns:
+            dict: Endpoint to its requests, failures, retries, bytes and
+            total, mean, p50, p95 and max latency in seconds
+        """
+        with self._lock:
+            summary = {}
+            for endpoint, requests in self._requests.items():
+                latencies = np.array(self._latencies[endpoint])
+                summary[endpoint] = {
+                    "requests": requests,
+                    "failures": self._failures[endpoint],
+                    "retries": self._retries[endpoint],
+                    "bytes": self._bytes[endpoint],
+                    "total_seconds": self._total_seconds[endpoint],
+                    "mean_seconds": self._total_seconds[endpoint] / requests,
+                    "p50_seconds": float(np.percentile(latencies, 50)),
+                    "p95_seconds": float(np.percentile(latencies, 95)),
+                    "max_seconds": self._max_seconds[endpoint],
+                }
+            return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._total_seconds.clear()
+            self._max_seconds.clear()
+            self._latencies.clear()
+            self._failures.clear()
+            self._retries.clear()
+            self._bytes.clear()
+
+
+class HttpClient:
+    """
+    GET requests with timeouts, exponential backoff on 429 and 5xx
+    responses or connection errors, and per-endpoint latency metrics
+    """
+
+    def __init__(
+        self,
+        transport=None,
+        connect_timeout_seconds: float = HTTP_CONNECT_TIMEOUT_SECONDS,
+        read_timeout_seconds: float = HTTP_READ_TIMEOUT_SECONDS,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_seconds: float = HTTP_BACKOFF_SECONDS,
+    ):
+        self.transport = transport or RequestsTransport()
+        self.timeout = (connect_timeout_seconds, read_timeout_seconds)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.metrics = RequestMetrics()
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = None
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+            except ValueError:
+                pass
+        return min(self.backoff_seconds * 2**attempt, MAX_BACKOFF_SECONDS)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        endpoint: Optional[str] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        Sends a GET request, retrying 429 and 5xx responses and connection
+        errors with exponential backoff
+
+        Args:
+            url (str): The URL
+            params (Optional[dict]): The query parameters
+            endpoint (Optional[str]): Name the request is counted under in metrics, defaults to url
+            stream (bool): If the body should be left unread for streaming
+
+        Returns:
+            requests.Response: The last response, whatever its status code
+
+        Raises:
+            requests.RequestException: If the last attempt could not connect
+        """
+        endpoint = endpoint or url
+        with span(f"http.{endpoint}"):
+            start = time.perf_counter()
+            attempt = 0
+            while True:
+                try:
+                    response = self.transport.send(
+                        "GET", url, params, self.timeout, stream=stream
+                    )
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.max_retries:
+                        self.metrics.record(
+                            endpoint=endpoint,
+                            latency_seconds=time.perf_counter() - start,
+                            failed=True,
+                            retries=attempt,
+                            bytes_received=0,
+                        )
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+
+                if (
+                    response.status_code in RETRY_STATUS_CODES
+                    and attempt < self.max_retries
+                ):
+                    response.close()
+                    time.sleep(self._backoff(attempt, response=response))
+                    attempt += 1
+                    continue
+
+                self.metrics.record(
+                    endpoint=endpoint,
+                    latency_seconds=time.perf_counter() - start,
+                    failed=response.status_code != 200,
+                    retries=attempt,
+                    bytes_received=(
+                        0 if stream else len(response.content or b"")
+                    ),
+                )
+                if stream:
+                    self._count_streamed_bytes(response, endpoint)
+                return response
+
+    def _count_streamed_bytes(
+        self, response: requests.Response, endpoint: str
+    ) -> None:
+        # A streamed body is read after get returns, so its bytes are
+        # counted as they are read. Response.content and json() read
+        # through iter_content too
+        iter_content = response.iter_content
+
+        def counted_iter_content(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                self.metrics.add_bytes(endpoint, len(chunk))
+                yield chunk
+
+        response.iter_content = counted_iter_content
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def http_client() -> HttpClient:
+    """
+    Provides the process wide HTTP client, so every call shares one
+    connection pool
+
+    Args:
+        None
+
+    Returns:
+        HttpClient: The shared client
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+def set_http_client(client: Optional[HttpClient]) -> None:
+    """
+    Replaces the process wide HTTP client, for example with one using a
+    fake transport. None restores the default on next use
+
+    Args:
+        client (Optional[HttpClient]): The new client
+
+    Returns:
+        None
+    """
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
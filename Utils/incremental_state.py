@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import tempfile
+import zipfile
+from typing import Optional
+
+import numpy as np
+
+from Utils.settings import MOMENTUM_STATE_DIRECTORY
+
+# Sandbox runs keep their state apart so it never mixes with live data
+SANDBOX_STATE_SUBDIRECTORY = "sandbox"
+
+
+def state_path(
+    name: str,
+    sandbox: bool = False,
+    state_directory: str = MOMENTUM_STATE_DIRECTORY,
+) -> str:
+    """
+    Provides the file the state of an incremental run is kept in
+
+    Args:
+        name (str): The state's name, e.g. a change window
+        sandbox (bool): If the state is of a sandbox run
+        state_directory (str): The directory incremental state is kept in
+
+    Returns:
+        str: The .npz state file
+    """
+    if sandbox:
+        state_directory = os.path.join(
+            state_directory, SANDBOX_STATE_SUBDIRECTORY
+        )
+    return os.path.join(state_directory, f"{name}.npz")
+
+
+def load_state(path: str, names: tuple) -> Optional[dict]:
+    """
+    Provides the arrays persisted by the last incremental run
+
+    A state file missing any of names, e.g. one written in an older
+    format, or one that cannot be read is removed and treated as missing
+
+    Args:
+        path (str): The state file
+        names (tuple): The names of the arrays to read
+
+    Returns:
+        Optional[dict]: Name to np.ndarray, None when there is no usable state
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as stored:
+            return {name: stored[name] for name in names}
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+
+def save_state(path: str, state: dict) -> None:
+    """
+    Persists the state of an incremental run, replacing the file atomically
+
+    Args:
+        path (str): The state file
+        state (dict): Name to array, or to a scalar stored as a 0-d array
+
+    Returns:
+        None
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        suffix=".npz", dir=directory
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as state_file:
+            np.savez(
+                state_file,
+                **{name: np.asarray(value) for name, value in state.items()},
+            )
+        os.replace(temporary_path, path)
+    except Exception:
+        os.remove(temporary_path)
+        raise
@@ -0,0 +1,316 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import functools
+import json
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from Utils.settings import CHROME_TRACE, TIMING_REPORTS
+
+
+class Instrumentation:
+    """
+    Thread safe record of the spans and counters of one run
+
+    A span is a named, timed stage and a counter a named running total,
+    such as requests made or bytes received. Recording a span costs one
+    clock read at each end and one list append
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._origin = time.perf_counter()
+            self._spans = []
+            self._counters = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict]:
+        """
+        Times the enclosed block as a span
+
+        Args:
+            name (str): The stage name
+            **attributes: Details kept with the span, the yielded dict may be updated inside the block
+
+        Returns:
+            Iterator[dict]: The span's attributes
+        """
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._spans.append(
+                    (name, start, end, threading.get_ident(), attributes)
+                )
+
+    def increment(self, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def report(self) -> dict:
+        """
+        Provides the timing breakdown of the run so far
+
+        Args:
+            None
+
+        Returns:
+            dict: The run's start time and wall seconds, per stage its
+            calls, total, mean and max seconds, in order of first start,
+            and the counters
+        """
+        with self._lock:
+            spans = sorted(self._spans, key=lambda span: span[1])
+            counters = dict(self._counters)
+            origin = self._origin
+
+        stages = {}
+        for name, start, end, _, _ in spans:
+            stage = stages.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "first_start_seconds": start - origin,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                },
+            )
+            stage["calls"] += 1
+            stage["total_seconds"] += end - start
+            stage["max_seconds"] = max(stage["max_seconds"], end - start)
+        for stage in stages.values():
+            stage["mean_seconds"] = stage["total_seconds"] / stage["calls"]
+
+        last_end = max((end for _, _, end, _, _ in spans), default=origin)
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": last_end - origin,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def chrome_trace(self) -> dict:
+        """
+        Provides the spans in Chrome's trace event format, viewable in
+        chrome://tracing or Perfetto, one track per thread
+
+        Args:
+            None
+
+        Returns:
+            dict: The trace, counters in its metadata
+        """
+        with self._lock:
+            spans = list(self._spans)
+            counters = dict(self._counters)
+            origin = self._origin
+
+        process_id = os.getpid()
+        thread_ids = {}
+        events = []
+        for name, start, end, thread, attributes in spans:
+            thread_id = thread_ids.setdefault(thread, len(thread_ids))
+            events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": process_id,
+                    "tid": thread_id,
+                    "args": {
+                        key: str(value) for key, value in attributes.items()
+                    },
+                }
+            )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": counters,
+        }
+
+
+# The instrumentation of the run active in the current context, None
+# outside instrumented runs so nothing is recorded there
+_active_instrumentation: ContextVar[Optional[Instrumentation]] = ContextVar(
+    "active_instrumentation", default=None
+)
+
+
+def instrumentation() -> Optional[Instrumentation]:
+    """
+    Provides the instrumentation of the active run
+
+    Args:
+        None
+
+    Returns:
+        Optional[Instrumentation]: The run's instrumentation, None outside instrumented runs
+    """
+    return _active_instrumentation.get()
+
+
+@contextmanager
+def _no_span(name: str, **attributes) -> Iterator[dict]:
+    yield attributes
+
+
+def span(name: str, **attributes):
+    """
+    Times the enclosed block as a span of the active run, recording
+    nothing outside instrumented runs
+
+    Args:
+        name (str): The stage name
+        **attributes: Details kept with the span
+
+    Returns:
+        The span's context manager
+    """
+    active_instrumentation = _active_instrumentation.get()
+    if active_instrumentation is None:
+        return _no_span(name, **attributes)
+    return active_instrumentation.span(name, **attributes)
+
+
+def increment(counter: str, amount: float = 1) -> None:
+    """
+    Adds to a counter of the active run, if any
+
+    Args:
+        counter (str): The counter name
+        amount (float): The amount added
+
+    Returns:
+        None
+    """
+    active_instrumentation = _active_instrumentation.get()
+    if active_instrumentation is not None:
+        active_instrumentation.increment(counter, amount)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator timing every call of a function as a span of the active run
+
+    Args:
+        name (Optional[str]): The stage name, defaults to the function's name
+
+    Returns:
+        Callable: The decorator
+    """
+
+    def decorator(function: Callable) -> Callable:
+        stage = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def in_current_run(function: Callable) -> Callable:
+    """
+    Binds a function to the run active where it is wrapped, so its spans
+    and counters are recorded when it is called on a worker thread, which
+    does not inherit the caller's context
+
+    Args:
+        function (Callable): The function, e.g. one mapped over a ThreadPoolExecutor
+
+    Returns:
+        Callable: The bound function
+    """
+    active_instrumentation = _active_instrumentation.get()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _active_instrumentation.set(active_instrumentation)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _active_instrumentation.reset(token)
+
+    return wrapper
+
+
+def instrumented_run(report_name: str) -> Callable:
+    """
+    Decorator making every call of a function one instrumented run
+
+    Each run records into its own Instrumentation, so concurrent runs do
+    not see each other's spans. The run is timed as a span, and when it
+    ends, even on failure, the breakdown is written to
+    '<report_name> Timings.json' if TIMING_REPORTS and the spans to
+    '<report_name> Trace.json' if CHROME_TRACE. A report that cannot be
+    written is logged, never changing what the run returns or raises
+
+    Args:
+        report_name (str): The name of the run's report files
+
+    Returns:
+        Callable: The decorator
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            run_instrumentation = Instrumentation()
+            token = _active_instrumentation.set(run_instrumentation)
+            try:
+                with run_instrumentation.span(function.__name__):
+                    return function(*args, **kwargs)
+            finally:
+                _active_instrumentation.reset(token)
+                try:
+                    write_run_report(run_instrumentation, report_name)
+                except Exception:
+                    print(traceback.format_exc())
+
+        return wrapper
+
+    return decorator
+
+
+def write_run_report(
+    run_instrumentation: Instrumentation,
+    report_name: str,
+    timing_report: bool = TIMING_REPORTS,
+    chrome_trace: bool = CHROME_TRACE,
+) -> None:
+    """
+    Writes the instrumentation of a run to the working directory
+
+    Args:
+        run_instrumentation (Instrumentation): The run's instrumentation
+        report_name (str): The name of the report files
+        timing_report (bool): If '<report_name> Timings.json' should be written
+        chrome_trace (bool): If '<report_name> Trace.json' should be written
+
+    Returns:
+        None
+    """
+    if timing_report:
+        with open(f"{report_name} Timings.json", "w") as report_file:
+            json.dump(run_instrumentation.report(), report_file, indent=4)
+    if chrome_trace:
+        with open(f"{report_name} Trace.json", "w") as trace_file:
+            json.dump(run_instrumentation.chrome_trace(), trace_file)
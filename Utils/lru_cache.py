@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    Thread safe mapping that evicts the least recently used entry once more
+    than maxsize entries are stored
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Provides the value for key and marks it as most recently used
+
+        Args:
+            key (Hashable): The key
+            default (Any): Returned when key is not cached
+
+        Returns:
+            Any: The cached value or default
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores value for key, evicting the least recently used entry if full
+
+        Args:
+            key (Hashable): The key
+            value (Any): The value
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """
+    Thread safe sliding window limiter allowing at most requests_per_minute
+    calls to acquire in any 60 second window
+
+    A requests_per_minute of 0 or None disables throttling
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, requests_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self._request_times = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until another request fits in the window
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        if not self.requests_per_minute:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while (
+                    self._request_times
+                    and now - self._request_times[0] >= self.WINDOW_SECONDS
+                ):
+                    self._request_times.popleft()
+                if len(self._request_times) < self.requests_per_minute:
+                    self._request_times.append(now)
+                    return
+                wait = self.WINDOW_SECONDS - (now - self._request_times[0])
+            time.sleep(wait)
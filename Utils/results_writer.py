@@ -0,0 +1,248 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import csv
+import json
+import traceback
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from Utils.settings import RESULTS_FORMATS
+
+# Schema metadata key of the portfolio summary in Parquet files
+SUMMARY_METADATA_KEY = b"portfolio_summary"
+PARQUET_COMPRESSION = "zstd"
+
+
+def portfolio_summary(
+    portfolio_amount: float,
+    capital_invested: float,
+    stocks_unavailable_in_the_past: Optional[list] = None,
+) -> dict:
+    """
+    Provides the summary statistics of a portfolio, kept apart from its
+    holdings so their columns stay typed
+
+    Args:
+        portfolio_amount (float): The portfolio amount
+        capital_invested (float): The total capital invested
+        stocks_unavailable_in_the_past (Optional[list]): The stocks which were unavailable in the past to calculate
+
+    Returns:
+        dict: Summary label to value, in display order
+    """
+    summary = {
+        "Total Capital": portfolio_amount,
+        "Capital invested": round(capital_invested, 2),
+        "Capital remaining": round(portfolio_amount - capital_invested, 2),
+    }
+    if stocks_unavailable_in_the_past is not None:
+        summary["Stocks not available in the past to evaluate (Count)"] = len(
+            stocks_unavailable_in_the_past
+        )
+        summary["Stocks not available in the past to evaluate (List)"] = list(
+            stocks_unavailable_in_the_past
+        )
+    return summary
+
+
+def write_results_csv(
+    holdings: pd.DataFrame,
+    summary: dict,
+    path: str,
+    separator_row: bool = True,
+) -> None:
+    """
+    Writes the holdings as CSV followed by one row per summary statistic,
+    'Label:' in the first column and the value in the second, as the
+    screeners always have
+
+    Without a blank separator row the summary values continue the second
+    holdings column, so while it is a float column numbers are written as
+    floats, e.g. 'Total Capital:,1000000.0', as pandas wrote them
+
+    Args:
+        holdings (pd.DataFrame): The holdings
+        summary (dict): Summary label to value
+        path (str): The CSV file
+        separator_row (bool): If a blank row separates the summary from the holdings
+
+    Returns:
+        None
+    """
+    holdings.to_csv(path, index=False)
+    padding = [""] * (len(holdings.columns) - 2)
+    float_column = not separator_row and pd.api.types.is_float_dtype(
+        holdings.iloc[:, 1]
+    )
+    with open(path, "a", newline="") as csv_file:
+        writer = csv.writer(csv_file, lineterminator=os.linesep)
+        if separator_row:
+            writer.writerow([""] * len(holdings.columns))
+        for label, value in summary.items():
+            if isinstance(value, list):
+                value = str(value)
+            if float_column and isinstance(value, (int, float)):
+                value = float(value)
+            else:
+                # Any other value turns the column into text
+                float_column = False
+            writer.writerow([f"{label}:", value, *padding])
+
+
+def write_results_parquet(
+    holdings: pd.DataFrame, summary: dict, path: str
+) -> None:
+    """
+    Writes the holdings as a compressed Parquet file with typed columns,
+    the summary stored as JSON in the schema metadata
+
+    Needs pyarrow, which is optional and only imported here
+
+    Args:
+        holdings (pd.DataFrame): The holdings
+        summary (dict): Summary label to value
+        path (str): The Parquet file
+
+    Returns:
+        None
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError(
+            "Parquet results need pyarrow: pip install pyarrow"
+        ) from None
+
+    table = pa.Table.from_pandas(holdings, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            SUMMARY_METADATA_KEY: json.dumps(summary).encode(),
+        }
+    )
+    pq.write_table(table, path, compression=PARQUET_COMPRESSION)
+
+
+def read_results_parquet(path: str) -> Tuple[pd.DataFrame, dict]:
+    """
+    Reads a Parquet file written by write_results_parquet
+
+    Args:
+        path (str): The Parquet file
+
+    Returns:
+        Tuple[pd.DataFrame, dict]: The holdings and the summary
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    summary = json.loads(metadata.get(SUMMARY_METADATA_KEY, b"{}"))
+    return table.to_pandas(), summary
+
+
+def write_results_xlsx(
+    holdings: pd.DataFrame, summary: dict, path: str
+) -> None:
+    """
+    Writes the holdings to a 'Holdings' sheet and the summary to a
+    'Summary' sheet of an Excel workbook
+
+    The workbook is written in XlsxWriter's constant_memory mode, each row
+    flushed to disk once written, so memory stays flat however many
+    holdings there are. NaN is written as Excel's #NUM! error
+
+    Args:
+        holdings (pd.DataFrame): The holdings
+        summary (dict): Summary label to value
+        path (str): The .xlsx file
+
+    Returns:
+        None
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(
+        path, {"constant_memory": True, "nan_inf_to_errors": True}
+    )
+    try:
+        header_format = workbook.add_format({"bold": True})
+
+        holdings_sheet = workbook.add_worksheet("Holdings")
+        holdings_sheet.write_row(0, 0, list(holdings.columns), header_format)
+        # Plain Python values take XlsxWriter's fast type dispatch
+        columns = [holdings[column].tolist() for column in holdings.columns]
+        for row, values in enumerate(zip(*columns), start=1):
+            holdings_sheet.write_row(row, 0, values)
+
+        summary_sheet = workbook.add_worksheet("Summary")
+        for row, (label, value) in enumerate(summary.items()):
+            summary_sheet.write_string(row, 0, label, header_format)
+            summary_sheet.write(
+                row, 1, str(value) if isinstance(value, list) else value
+            )
+    finally:
+        workbook.close()
+
+
+RESULTS_WRITERS = {
+    "csv": write_results_csv,
+    "parquet": write_results_parquet,
+    "xlsx": write_results_xlsx,
+}
+
+
+def write_results(
+    holdings: pd.DataFrame,
+    summary: dict,
+    report_name: str,
+    results_formats: Optional[list] = None,
+    separator_row: bool = True,
+) -> Tuple[list, bool]:
+    """
+    Writes a screener's holdings and summary in every results format,
+    '<report_name>.<results_format>' in the working directory
+
+    A format that fails, e.g. Parquet without pyarrow, is reported and the
+    others are still written
+
+    Args:
+        holdings (pd.DataFrame): The holdings, one typed row per stock
+        summary (dict): Summary label to value, see portfolio_summary
+        report_name (str): The name of the results files
+        results_formats (Optional[list]): Any of 'csv', 'parquet' and 'xlsx', defaults to RESULTS_FORMATS
+        separator_row (bool): If a blank row separates the CSV summary from the holdings
+
+    Returns:
+        Tuple[list, bool]: The files written and a Status which is False if any format failed
+    """
+    if results_formats is None:
+        results_formats = RESULTS_FORMATS
+    paths = []
+    status = True
+    for results_format in results_formats:
+        if results_format not in RESULTS_WRITERS:
+            print(f"Unknown results format: {results_format}")
+            status = False
+            continue
+        path = f"{report_name}.{results_format}"
+        try:
+            if results_format == "csv":
+                write_results_csv(
+                    holdings, summary, path, separator_row=separator_row
+                )
+            else:
+                RESULTS_WRITERS[results_format](holdings, summary, path)
+            paths.append(path)
+        except Exception:
+            print(traceback.format_exc())
+            status = False
+    return paths, status
@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(".."))
+
+import constants
+
+# Optional constants.py settings, falling back to these defaults when unset
+
+# Polygon plan tier request budget, 5 for the free tier, 0 for unlimited
+POLYGON_REQUESTS_PER_MINUTE = getattr(
+    constants, "POLYGON_REQUESTS_PER_MINUTE", 0
+)
+# Concurrent requests made by the bulk fetchers
+POLYGON_MAX_WORKERS = getattr(constants, "POLYGON_MAX_WORKERS", 8)
+
+# Grouped-daily response cache
+POLYGON_CACHE_DIRECTORY = getattr(
+    constants,
+    "POLYGON_CACHE_DIRECTORY",
+    os.path.join(os.path.expanduser("~"), ".cache", "algorithm-trading"),
+)
+POLYGON_CACHE_MEMORY_ENTRIES = getattr(
+    constants, "POLYGON_CACHE_MEMORY_ENTRIES", 8
+)
+# Responses for today or later may still change, so they expire
+POLYGON_INCOMPLETE_DAY_TTL_SECONDS = getattr(
+    constants, "POLYGON_INCOMPLETE_DAY_TTL_SECONDS", 900
+)
+
+# Local warehouse of grouped-daily bars, partitioned by date
+BAR_WAREHOUSE_DIRECTORY = getattr(
+    constants,
+    "BAR_WAREHOUSE_DIRECTORY",
+    os.path.join(POLYGON_CACHE_DIRECTORY, "bar_warehouse"),
+)
+
+# HTTP client used for every Polygon and wikitable2json request
+POLYGON_BASE_URL = getattr(
+    constants, "POLYGON_BASE_URL", "https://api.polygon.io"
+)
+WIKITABLE2JSON_BASE_URL = getattr(
+    constants, "WIKITABLE2JSON_BASE_URL", "https://www.wikitable2json.com"
+)
+HTTP_CONNECT_TIMEOUT_SECONDS = getattr(
+    constants, "HTTP_CONNECT_TIMEOUT_SECONDS", 5.0
+)
+HTTP_READ_TIMEOUT_SECONDS = getattr(
+    constants, "HTTP_READ_TIMEOUT_SECONDS", 30.0
+)
+HTTP_MAX_RETRIES = getattr(constants, "HTTP_MAX_RETRIES", 3)
+HTTP_BACKOFF_SECONDS = getattr(constants, "HTTP_BACKOFF_SECONDS", 0.5)
+HTTP_POOL_SIZE = getattr(constants, "HTTP_POOL_SIZE", 16)
+
+# S&P 500 constituent list cache
+SPY_CONSTITUENTS_CACHE_PATH = getattr(
+    constants,
+    "SPY_CONSTITUENTS_CACHE_PATH",
+    os.path.join(POLYGON_CACHE_DIRECTORY, "spy_constituents.json"),
+)
+SPY_CONSTITUENTS_REVALIDATE_SECONDS = getattr(
+    constants, "SPY_CONSTITUENTS_REVALIDATE_SECONDS", 24 * 60 * 60
+)
+
+# Point-in-time S&P 500 membership intervals
+SPY_MEMBERSHIP_PATH = getattr(
+    constants,
+    "SPY_MEMBERSHIP_PATH",
+    os.path.join(POLYGON_CACHE_DIRECTORY, "spy_membership.csv"),
+)
+
+# Per change window closes and returns, and market caps, persisted by the
+# last incremental screener run
+MOMENTUM_STATE_DIRECTORY = getattr(
+    constants,
+    "MOMENTUM_STATE_DIRECTORY",
+    os.path.join(POLYGON_CACHE_DIRECTORY, "momentum_state"),
+)
+
+# Benchmark results of every commit, compared to flag regressions
+BENCHMARK_HISTORY_PATH = getattr(
+    constants,
+    "BENCHMARK_HISTORY_PATH",
+    os.path.join(POLYGON_CACHE_DIRECTORY, "benchmark_history.json"),
+)
+
+# Per-run timing breakdown of the screeners, off by default, written next
+# to their CSVs as '<report> Timings.json', and optionally as a Chrome trace
+TIMING_REPORTS = getattr(constants, "TIMING_REPORTS", False)
+CHROME_TRACE = getattr(constants, "CHROME_TRACE", False)
+
+# Formats the screener results are written in, any of 'csv', 'parquet' and
+# 'xlsx', Parquet and Excel being opt-in
+RESULTS_FORMATS = getattr(constants, "RESULTS_FORMATS", ["csv"])
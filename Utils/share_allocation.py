@@ -0,0 +1,103 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from Utils.instrumentation import traced
+
+
+def allocate_shares(
+    stock_prices: np.ndarray, position_size: float
+) -> Tuple[np.ndarray, float]:
+    """
+    Number of whole shares of every stock that fit in position_size
+
+    Args:
+        stock_prices (np.ndarray): The price of every stock
+        position_size (float): The '$' amount for every stock
+
+    Returns:
+        Tuple[np.ndarray, float]:
+        The number of shares of every stock and the capital invested
+    """
+    stock_prices = np.asarray(stock_prices, dtype=np.float64)
+    number_of_shares = np.zeros(len(stock_prices), dtype=np.int64)
+    priced = stock_prices > 0
+    number_of_shares[priced] = np.floor(position_size / stock_prices[priced])
+    capital_invested = float(np.round(number_of_shares * stock_prices, 2).sum())
+    return number_of_shares, capital_invested
+
+
+def redistribute_residual_cash(
+    stock_prices: np.ndarray,
+    number_of_shares: np.ndarray,
+    position_size: float,
+    cash_remaining: float,
+) -> Tuple[np.ndarray, float]:
+    """
+    Greedily spends the cash left over by whole share rounding, buying one
+    more share of the stocks furthest below position_size first
+
+    Every position is below position_size by less than one share, so one
+    extra share per stock keeps the portfolio close to equal weight. The
+    sort makes this O(n log n)
+
+    Args:
+        stock_prices (np.ndarray): The price of every stock
+        number_of_shares (np.ndarray): The shares already allocated
+        position_size (float): The '$' amount for every stock
+        cash_remaining (float): The cash not yet invested
+
+    Returns:
+        Tuple[np.ndarray, float]:
+        The new number of shares of every stock and the cash still remaining
+    """
+    stock_prices = np.asarray(stock_prices, dtype=np.float64)
+    number_of_shares = np.array(number_of_shares, dtype=np.int64)
+    shortfall = position_size - number_of_shares * stock_prices
+    for index in np.argsort(-shortfall, kind="stable"):
+        stock_price = stock_prices[index]
+        if 0 < stock_price <= cash_remaining:
+            number_of_shares[index] += 1
+            cash_remaining -= stock_price
+    return number_of_shares, round(cash_remaining, 2)
+
+
+@traced()
+def allocate_portfolio(
+    portfolio_data_frame: pd.DataFrame,
+    portfolio_amount: float,
+    position_size: float,
+    redistribute_cash: bool = False,
+) -> float:
+    """
+    Does in place update of the "Number of Shares to Purchase" column of the
+    portfolio_data_frame from its "Stock Price" column
+
+    Args:
+        portfolio_data_frame (pd.DataFrame): The DataFrame to be modified
+        portfolio_amount (float): The '$' amount of the portfolio
+        position_size (float): The '$' amount for every stock
+        redistribute_cash (bool): If the cash left over by rounding should buy extra shares
+
+    Returns:
+        float: The capital invested
+    """
+    stock_prices = portfolio_data_frame["Stock Price"].to_numpy(
+        dtype=np.float64
+    )
+    number_of_shares, capital_invested = allocate_shares(
+        stock_prices=stock_prices, position_size=position_size
+    )
+    if redistribute_cash:
+        number_of_shares, _ = redistribute_residual_cash(
+            stock_prices=stock_prices,
+            number_of_shares=number_of_shares,
+            position_size=position_size,
+            cash_remaining=portfolio_amount - capital_invested,
+        )
+        capital_invested = float(
+            np.round(number_of_shares * stock_prices, 2).sum()
+        )
+    portfolio_data_frame["Number of Shares to Purchase"] = number_of_shares
+    return capital_invested
@@ -0,0 +1,219 @@
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+FIRST_CALENDAR_YEAR = 1990
+LAST_CALENDAR_YEAR = 2099
+
+# Unscheduled full day closures
+NYSE_SPECIAL_CLOSURES = (
+    "1994-04-27",  # President Nixon's funeral
+    "2001-09-11",  # September 11 attacks
+    "2001-09-12",
+    "2001-09-13",
+    "2001-09-14",
+    "2004-06-11",  # President Reagan's funeral
+    "2007-01-02",  # President Ford's funeral
+    "2012-10-29",  # Hurricane Sandy
+    "2012-10-30",
+    "2018-12-05",  # President George H. W. Bush's funeral
+    "2025-01-09",  # President Carter's funeral
+)
+
+
+def _weekdays(days: np.ndarray) -> np.ndarray:
+    # Monday is 0, 1970-01-01 was a Thursday
+    return (days.astype(np.int64) + 3) % 7
+
+
+def _dates(years: np.ndarray, month: int, day: int) -> np.ndarray:
+    return (
+        (years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+        + (month - 1)
+    ).astype("datetime64[D]") + (day - 1)
+
+
+def _nth_weekday(
+    years: np.ndarray, month: int, weekday: str, n: int
+) -> np.ndarray:
+    return np.busday_offset(
+        _dates(years, month, 1), n - 1, roll="forward", weekmask=weekday
+    )
+
+
+def _last_weekday(
+    years: np.ndarray, month: int, last_day: int, weekday: str
+) -> np.ndarray:
+    return np.busday_offset(
+        _dates(years, month, last_day), 0, roll="backward", weekmask=weekday
+    )
+
+
+def _observed(days: np.ndarray) -> np.ndarray:
+    # Saturday holidays are observed on Friday, Sunday ones on Monday
+    weekdays = _weekdays(days)
+    return days + np.where(weekdays == 5, -1, np.where(weekdays == 6, 1, 0))
+
+
+def _easter_sundays(years: np.ndarray) -> np.ndarray:
+    # Anonymous Gregorian algorithm
+    a = years % 19
+    b, c = years // 100, years % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return (
+        (years - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+        + (month - 1)
+    ).astype("datetime64[D]") + (day - 1)
+
+
+def nyse_holidays(first_year: int, last_year: int) -> np.ndarray:
+    """
+    Provides the full day NYSE holidays falling on weekdays, from the
+    exchange's holiday rules
+
+    Args:
+        first_year (int): First year
+        last_year (int): Last year, inclusive
+
+    Returns:
+        np.ndarray: The sorted datetime64[D] holidays
+    """
+    years = np.arange(first_year, last_year + 1)
+
+    # A Saturday New Year's Day is not observed on the Friday before
+    new_years_days = _dates(years, 1, 1)
+    new_years_days = new_years_days[_weekdays(new_years_days) != 5]
+
+    juneteenth_years = years[years >= 2022]
+    martin_luther_king_years = years[years >= 1998]
+    holidays = np.concatenate(
+        [
+            _observed(new_years_days),
+            _nth_weekday(martin_luther_king_years, 1, "Mon", 3),
+            _nth_weekday(years, 2, "Mon", 3),
+            _easter_sundays(years) - 2,
+            _last_weekday(years, 5, 31, "Mon"),
+            _observed(_dates(juneteenth_years, 6, 19)),
+            _observed(_dates(years, 7, 4)),
+            _nth_weekday(years, 9, "Mon", 1),
+            _nth_weekday(years, 11, "Thu", 4),
+            _observed(_dates(years, 12, 25)),
+        ]
+    )
+    holidays = holidays[
+        (holidays >= _dates(years[:1], 1, 1)[0])
+        & (holidays <= _dates(years[-1:], 12, 31)[0])
+    ]
+    return np.unique(holidays)
+
+
+class TradingCalendar:
+    """
+    Offline calendar of the exchange's trading sessions
+
+    Every session in the covered years is precomputed into one sorted
+    datetime64 array, so a session lookup is a binary search, O(log n)
+    """
+
+    def __init__(
+        self,
+        first_year: int = FIRST_CALENDAR_YEAR,
+        last_year: int = LAST_CALENDAR_YEAR,
+        special_closures: Tuple[str, ...] = NYSE_SPECIAL_CLOSURES,
+    ):
+        self.holidays = np.union1d(
+            nyse_holidays(first_year, last_year),
+            np.array(special_closures, dtype="datetime64[D]"),
+        )
+        days = np.arange(
+            np.datetime64(f"{first_year}-01-01", "D"),
+            np.datetime64(f"{last_year + 1}-01-01", "D"),
+        )
+        self.sessions = days[np.is_busday(days, holidays=self.holidays)]
+        self.first_date = days[0]
+        self.last_date = days[-1]
+
+    def _check_range(self, dates: np.ndarray) -> None:
+        if len(dates) and (
+            dates.min() < self.first_date or dates.max() > self.last_date
+        ):
+            raise ValueError(
+                f"Dates outside the calendar, {self.first_date} to {self.last_date}"
+            )
+
+    def is_session(self, date: str) -> bool:
+        return self.previous_session(date) == str(
+            np.datetime64(date, "D")
+        )
+
+    def previous_sessions(self, dates) -> np.ndarray:
+        """
+        Provides the last session on or before every date
+
+        Args:
+            dates: The dates, any array-like of YYYY-MM-DD or datetime64
+
+        Returns:
+            np.ndarray: The datetime64[D] sessions
+
+        Raises:
+            ValueError: If a date is outside the calendar or before its first session
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        self._check_range(dates.ravel())
+        positions = np.searchsorted(self.sessions, dates, side="right") - 1
+        if np.any(positions < 0):
+            raise ValueError("Dates before the first session of the calendar")
+        return self.sessions[positions]
+
+    def previous_session(self, date: str) -> str:
+        """
+        Provides the last session on or before a date
+
+        Args:
+            date (str): The date, YYYY-MM-DD
+
+        Returns:
+            str: The session, YYYY-MM-DD
+        """
+        return str(self.previous_sessions([date])[0])
+
+    def sessions_between(self, start_date: str, end_date: str) -> np.ndarray:
+        """
+        Provides the sessions between start_date and end_date
+
+        Args:
+            start_date (str): First date, YYYY-MM-DD
+            end_date (str): Last date, YYYY-MM-DD, inclusive
+
+        Returns:
+            np.ndarray: The datetime64[D] sessions
+        """
+        bounds = np.array([start_date, end_date], dtype="datetime64[D]")
+        self._check_range(bounds)
+        first = np.searchsorted(self.sessions, bounds[0], side="left")
+        last = np.searchsorted(self.sessions, bounds[1], side="right")
+        return self.sessions[first:last]
+
+
+@lru_cache(maxsize=None)
+def nyse_calendar() -> TradingCalendar:
+    """
+    Provides the process wide NYSE trading calendar
+
+    Args:
+        None
+
+    Returns:
+        TradingCalendar: The calendar
+    """
+    return TradingCalendar()
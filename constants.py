@@ -0,0 +1,3 @@
+POLYGON_API_KEY = ""
+POLYGON_API_ADJUSTED = "true"
+sandbox = True